@@ -1,14 +1,149 @@
+import os
 import numpy as np
 
 from .fast_fourier_transform import FastFourierTransform
-from ..field import Field, field_dot, field_conjugate_transpose
+from .fourier_transform import _get_float_and_complex_dtype
+from ..config import Configuration
+from ..field import Field
 
+# Use the fastest available FFT backend: mkl_fft, then the multithreaded scipy.fft, then numpy.fft.
 try:
 	import mkl_fft as _fft_module
-	_use_mkl = True
+	import mkl_fft._numpy_fft as _real_fft_module
+	_fft_backend = 'mkl'
 except ImportError:
-	_fft_module = np.fft
-	_use_mkl = False
+	try:
+		import scipy.fft as _fft_module
+		_real_fft_module = _fft_module
+		_fft_backend = 'scipy'
+	except ImportError:
+		_fft_module = np.fft
+		_real_fft_module = np.fft
+		_fft_backend = 'numpy'
+
+# The approximate size in bytes of the blocks of rows that are filtered while they are in cache.
+_filter_block_size = 2**18
+
+try:
+	import pyfftw
+	_use_pyfftw = True
+except ImportError:
+	_use_pyfftw = False
+
+try:
+	import cupy
+	import cupyx.scipy.fft as _cupy_fft_module
+	_cupy_available = True
+except ImportError:
+	_cupy_available = False
+
+# A pool of scratch buffers shared by all Fourier filters, keyed by shape and data type. Each
+# entry holds the buffer and a tag describing its contents, so that it can be reused without
+# clearing it. Least recently used keys are evicted first.
+_scratch_buffers = {}
+_max_num_scratch_buffer_keys = 8
+_max_num_scratch_buffers_per_key = 2
+
+def _borrow_scratch_buffer(shape, dtype, tag=None):
+	'''Borrow a scratch buffer from the pool, or allocate a new one if none is available.
+
+	Parameters
+	----------
+	shape : tuple
+		The shape of the buffer.
+	dtype : numpy dtype
+		The data type of the buffer.
+	tag : anything
+		The preferred tag. A buffer with this tag is borrowed if there is one, so that
+		its contents can be reused. Otherwise, the most recently returned buffer is borrowed.
+
+	Returns
+	-------
+	buffer : ndarray
+		The scratch buffer. Its contents are undefined, unless described by `tag`.
+	tag : anything
+		The tag that was given when the buffer was returned, or None for a new buffer.
+	'''
+	key = (tuple(shape), np.dtype(dtype))
+
+	# Move the key to the end to mark it as most recently used.
+	buffers = _scratch_buffers.pop(key, [])
+	_scratch_buffers[key] = buffers
+
+	if buffers:
+		for i, (buffer, buffer_tag) in enumerate(buffers):
+			if buffer_tag == tag:
+				return buffers.pop(i)
+
+		return buffers.pop()
+
+	if _use_pyfftw:
+		return pyfftw.empty_aligned(shape, dtype=dtype), None
+	else:
+		return np.empty(shape, dtype=dtype), None
+
+def _return_scratch_buffer(buffer, tag=None):
+	'''Return a scratch buffer to the pool.
+
+	Parameters
+	----------
+	buffer : ndarray
+		The buffer to return. This should not be used by the caller afterwards.
+	tag : anything
+		A description of the contents of the buffer for the next borrower.
+	'''
+	key = (buffer.shape, buffer.dtype)
+
+	buffers = _scratch_buffers.setdefault(key, [])
+	if len(buffers) < _max_num_scratch_buffers_per_key:
+		buffers.append((buffer, tag))
+
+	while len(_scratch_buffers) > _max_num_scratch_buffer_keys:
+		del _scratch_buffers[next(iter(_scratch_buffers))]
+
+def _clear_outside_cutout(array, cutout):
+	'''Set all elements of an array outside of a cutout to zero.
+
+	Parameters
+	----------
+	array : ndarray
+		The array to clear. This is modified in-place.
+	cutout : tuple of slices
+		The cutout, with a slice for each axis of the array.
+	'''
+	for axis, cut in enumerate(cutout):
+		if cut.start is None and cut.stop is None:
+			continue
+
+		index = [slice(None)] * array.ndim
+
+		index[axis] = slice(None, cut.start)
+		array[tuple(index)] = 0
+
+		index[axis] = slice(cut.stop, None)
+		array[tuple(index)] = 0
+
+def _multiply_in_place(f, tf, conjugate=False):
+	'''Multiply `f` in-place by `tf`, or by its complex conjugate.
+
+	The conjugate is applied as conj(conj(f) * tf), so that no conjugated copy
+	of `tf` needs to be allocated or kept.
+
+	Parameters
+	----------
+	f : ndarray
+		The array to multiply. This is modified in-place.
+	tf : ndarray
+		The array to multiply with.
+	conjugate : boolean
+		Whether to multiply by the complex conjugate of `tf` instead.
+	'''
+	if conjugate and np.iscomplexobj(tf):
+		np.conjugate(f, out=f)
+		np.multiply(f, tf, out=f)
+		np.conjugate(f, out=f)
+	else:
+		np.multiply(f, tf, out=f)
 
 class FourierFilter(object):
 	'''A filter in the Fourier domain.
@@ -17,6 +152,29 @@ class FourierFilter(object):
 	the equivalent multiplication in the Fourier domain using the FastFourierTransform
 	classes. It does this by avoiding redundant field multiplications that limit performance.
 
+	Real-valued input fields are filtered using real FFTs if the transfer function is
+	Hermitian, in which case the filtered field is real-valued as well.
+
+	The output field has the same precision as the input field. For single-precision
+	fields, the transfer function is cast to single precision as well, which halves
+	the memory traffic of the filtering at the cost of a relative accuracy of about 1e-7.
+
+	If pyFFTW is installed, FFTW plans are created once for each input shape and reused for all
+	subsequent filtering operations. Their aligned work buffers are borrowed from a pool shared by
+	all filters for the duration of each operation. The plans keep a reference to the last buffers
+	they were executed on, so each filter keeps at most two internal arrays alive. Filters with the
+	same internal shape, such as a chain of propagators, share these buffers through the pool.
+
+	The adjoint of a scalar transfer function is applied by multiplying with its conjugate
+	in-place. For matrix transfer functions, the conjugate transpose is computed on the first
+	backward operation and cached, which doubles the memory used by the transfer function.
+
+	If CuPy is installed, the filtering can be performed on the GPU instead. The transfer
+	function then stays resident in GPU memory.
+
+	The FFTs are performed by mkl_fft if it is installed. Otherwise the multithreaded
+	scipy.fft is used, with numpy.fft as a last resort.
+
 	Parameters
 	----------
 	input_grid : Grid
@@ -29,10 +187,24 @@ class FourierFilter(object):
 		The amount of zeropadding to perform in the real domain. A value
 		of 1 denotes no zeropadding. Zeropadding increases the resolution in the
 		Fourier domain and therefore reduces aliasing/wrapping effects.
+	use_cupy : boolean or None
+		Whether to perform the filtering on the GPU using CuPy. This is ignored if CuPy
+		is not installed. If this is None, the choice will be determined by the
+		configuration file.
+	threads : int or None
+		The number of threads to use for the FFTs with scipy.fft and pyFFTW. If this is None,
+		all available cores will be used.
 	'''
-	def __init__(self, input_grid, transfer_function, q=1):
+	def __init__(self, input_grid, transfer_function, q=1, use_cupy=None, threads=None):
 		fft = FastFourierTransform(input_grid, q)
 
+		# Get the value from the configuration file if left at the default.
+		if use_cupy is None:
+			use_cupy = Configuration().fourier.filter.use_cupy
+		self.use_cupy = use_cupy and _cupy_available
+
+		self.threads = threads
+
 		self.input_grid = input_grid
 		self.internal_grid = fft.output_grid
 		self.cutout = fft.cutout_input
@@ -40,26 +212,150 @@ class FourierFilter(object):
 
 		self.transfer_function = transfer_function
 
-		self._transfer_function = None
-		self.internal_array = None
+		# A Field transfer function is shifted into FFT order once here; a Field generator
+		# is evaluated and shifted on first use. The shift returns a new array, so the
+		# user's transfer function is never modified and does not need to be copied.
+		if hasattr(self.transfer_function, '__call__'):
+			self._transfer_function = None
+		else:
+			self._transfer_function = self._shift_to_fft_order(self.transfer_function)
+
+		self._transfer_functions = {}
+
+		self._transfer_function_is_hermitian = None
+		self._transfer_function_real = None
+
+		self._internal_shape = None
+		self._internal_dtype = None
+
+		self._fftw_forward = None
+		self._fftw_backward = None
+
+	def _shift_to_fft_order(self, tf):
+		'''Reorder the transfer function from centered order to the order produced by the FFT.
+
+		Parameters
+		----------
+		tf : Field
+			The transfer function, sampled on the internal grid.
+
+		Returns
+		-------
+		ndarray
+			The shaped transfer function in FFT order.
+		'''
+		return np.fft.ifftshift(tf.shaped, axes=tuple(range(-self.input_grid.ndim, 0)))
 
 	def _compute_functions(self, field):
-		if self._transfer_function is None or self._transfer_function.dtype != field.dtype:
-			if hasattr(self.transfer_function, '__call__'):
-				tf = self.transfer_function(self.internal_grid)
+		# The transfer function is kept in its native precision. Numpy promotes it
+		# during the in-place multiplication, so it never needs to be recomputed
+		# for a different field dtype.
+		if self._transfer_function is None:
+			self._transfer_function = self._shift_to_fft_order(self.transfer_function(self.internal_grid))
+
+		recompute_internal_array = self._internal_shape is None
+		recompute_internal_array = recompute_internal_array or (len(self._internal_shape) != (field.grid.ndim + field.tensor_order))
+		recompute_internal_array = recompute_internal_array or (self._internal_dtype != field.dtype)
+		recompute_internal_array = recompute_internal_array or not np.array_equal(self._internal_shape[:field.tensor_order], field.tensor_shape)
+
+		if recompute_internal_array:
+			# The internal array itself is borrowed from the scratch buffer pool when needed.
+			self._internal_shape = tuple(field.tensor_shape) + tuple(self.internal_grid.shape)
+			self._internal_dtype = field.dtype
+
+			if self._can_use_pyfftw(field):
+				self._make_fftw_plans(self._internal_shape, self._internal_dtype)
 			else:
-				tf = self.transfer_function.copy()
+				self._fftw_forward = None
+				self._fftw_backward = None
 
-			tf = np.fft.ifftshift(tf.shaped, axes=tuple(range(-self.input_grid.ndim, 0)))
-			self._transfer_function = tf.astype(field.dtype, copy=False)
+	def _compute_real_functions(self):
+		'''Check the transfer function for Hermitian symmetry, and compute the
+		part of it that is used by the real FFT if it is.
+		'''
+		if self._transfer_function_is_hermitian is not None:
+			return
 
-		recompute_internal_array = self.internal_array is None
-		recompute_internal_array = recompute_internal_array or (self.internal_array.ndim != (field.grid.ndim + field.tensor_order))
-		recompute_internal_array = recompute_internal_array or (self.internal_array.dtype != field.dtype)
-		recompute_internal_array = recompute_internal_array or np.all(self.internal_array.shape[:field.tensor_order] == field.tensor_shape)
+		tf = self._transfer_function
+		axes = tuple(range(-self.input_grid.ndim, 0))
 
-		if recompute_internal_array:
-			self.internal_array = self.internal_grid.zeros(field.tensor_shape, field.dtype).shaped
+		if (tf.ndim - self.internal_grid.ndim) != 0:
+			# Only scalar transfer functions are supported.
+			self._transfer_function_is_hermitian = False
+			return
+
+		# The FFT index of frequency -k is (n - k) % n for each axis.
+		tf_negative_frequencies = np.roll(np.flip(tf, axis=axes), 1, axis=axes)
+
+		atol = 1e-12 * np.abs(tf).max()
+		self._transfer_function_is_hermitian = np.allclose(tf, tf_negative_frequencies.conj(), rtol=1e-12, atol=atol)
+
+		if self._transfer_function_is_hermitian:
+			n = tf.shape[-1]
+			self._transfer_function_real = np.ascontiguousarray(tf[..., :n // 2 + 1])
+
+	def _can_use_pyfftw(self, field):
+		return _use_pyfftw and field.dtype in [np.dtype('complex64'), np.dtype('complex128')]
+
+	def _make_fftw_plans(self, shape, dtype):
+		'''Create the FFTW plans.
+
+		The forward plan transforms the internal array out-of-place into the
+		output buffer, leaving the zeropadded region of the internal array intact.
+		The backward plan transforms the output buffer in-place. The plans are made
+		on buffers from the scratch buffer pool, and are executed on whichever
+		buffers are borrowed for each operation.
+
+		Parameters
+		----------
+		shape : tuple
+			The shape of the internal array, including tensor dimensions.
+		dtype : numpy dtype
+			The complex data type of the internal array.
+		'''
+		if self._fftw_forward is not None:
+			if self._fftw_forward.input_shape == shape and self._fftw_forward.input_dtype == dtype:
+				# The current plans can be reused.
+				return
+
+		internal_array, _ = _borrow_scratch_buffer(shape, dtype)
+		fft_output, _ = _borrow_scratch_buffer(shape, dtype)
+
+		axes = tuple(range(-self.input_grid.ndim, 0))
+		threads = self.threads
+		if threads is None:
+			threads = os.cpu_count() or 1
+
+		self._fftw_forward = pyfftw.FFTW(internal_array, fft_output, axes=axes, direction='FFTW_FORWARD', flags=('FFTW_MEASURE',), threads=threads)
+		self._fftw_backward = pyfftw.FFTW(fft_output, fft_output, axes=axes, direction='FFTW_BACKWARD', flags=('FFTW_MEASURE',), threads=threads)
+
+		# Planning with FFTW_MEASURE overwrites the arrays, so their contents are undefined.
+		_return_scratch_buffer(internal_array)
+		_return_scratch_buffer(fft_output)
+
+	def _fft_kwargs(self, overwrite_x=False, real=False):
+		'''Get the keyword arguments for the FFT functions of the current backend.
+
+		Parameters
+		----------
+		overwrite_x : boolean
+			Whether the FFT is allowed to overwrite its input array.
+		real : boolean
+			Whether the keyword arguments are for a real FFT function.
+
+		Returns
+		-------
+		dict
+			The keyword arguments.
+		'''
+		if _fft_backend == 'scipy':
+			workers = -1 if self.threads is None else self.threads
+			return {'overwrite_x': overwrite_x, 'workers': workers}
+		elif _fft_backend == 'mkl' and overwrite_x and not real:
+			# The real FFTs of mkl_fft follow the numpy interface and do not support overwrite_x.
+			return {'overwrite_x': True}
+		else:
+			return {}
 
 	def forward(self, field):
 		'''Return the forward filtering of the input field.
@@ -108,52 +404,406 @@ class FourierFilter(object):
 		'''
 		self._compute_functions(field)
 
+		if self.use_cupy:
+			return self._operation_cupy(field, adjoint)
+
+		if np.isrealobj(field):
+			self._compute_real_functions()
+
+			if self._transfer_function_is_hermitian:
+				return self._operation_real(field, adjoint)
+
+		if self._fftw_forward is not None:
+			return self._operation_fftw(field, adjoint)
+
+		if self._can_fuse_filter(field):
+			f = self._zeropadded_fft(field.shaped, skip_last_axis=True)
+			f = self._filter_last_axis(f, adjoint)
+			f = self._cropped_ifft(f, skip_last_axis=True)
+
+			s = f.shape[:-self.internal_grid.ndim] + (-1,)
+			res = f.reshape(s)
+
+			float_dtype, complex_dtype = _get_float_and_complex_dtype(field.dtype)
+			return Field(res, self.input_grid).astype(complex_dtype, copy=False)
+
+		axes = tuple(range(-self.input_grid.ndim, 0))
+
 		if self.cutout is None:
-			f = field.shaped
+			f = _fft_module.fftn(field.shaped, axes=axes, **self._fft_kwargs())
 		else:
-			f = self.internal_array
-			f[:] = 0
-			c = tuple([slice(None)] * field.tensor_order) + self.cutout
-			f[c] = field.shaped
+			f = self._zeropadded_fft(field.shaped)
 
-		# Don't overwrite f if it's the input array.
-		if _use_mkl:
-			kwargs = {'overwrite_x': self.cutout is not None and field.grid.ndim > 1}
+		f = self._apply_transfer_function(f, adjoint)
+
+		if self.cutout is None:
+			f = _fft_module.ifftn(f, axes=axes, **self._fft_kwargs(overwrite_x=True))
 		else:
-			kwargs = {}
-		f = _fft_module.fftn(f, axes=tuple(range(-self.input_grid.ndim, 0)), **kwargs)
+			f = self._cropped_ifft(f)
 
-		if (self._transfer_function.ndim - self.internal_grid.ndim) == 2:
-			# The transfer function is a matrix field.
-			s1 = f.shape[:-self.internal_grid.ndim] + (self.internal_grid.size,)
-			f = Field(f.reshape(s1), self.internal_grid)
+		s = f.shape[:-self.internal_grid.ndim] + (-1,)
+		res = f.reshape(s)
 
-			s2 = self._transfer_function.shape[:-self.internal_grid.ndim] + (self.internal_grid.size,)
-			tf = Field(self._transfer_function.reshape(s2), self.internal_grid)
+		float_dtype, complex_dtype = _get_float_and_complex_dtype(field.dtype)
+		return Field(res, self.input_grid).astype(complex_dtype, copy=False)
 
-			if adjoint:
-				tf = field_conjugate_transpose(tf)
+	def _can_fuse_filter(self, field):
+		'''Whether the filtering can be fused with the FFTs along the last axis.
+
+		This requires a scalar transfer function and at least two dimensions, so that
+		there are rows to block over.
+
+		Parameters
+		----------
+		field : Field
+			The input field.
+
+		Returns
+		-------
+		boolean
+			Whether :meth:`_filter_last_axis` can be used.
+		'''
+		is_scalar = self._transfer_function.ndim == self.internal_grid.ndim
+
+		return is_scalar and self.input_grid.ndim >= 2 and np.iscomplexobj(field)
+
+	def _filter_last_axis(self, f, adjoint):
+		'''Perform the FFT along the last axis, the filtering, and the inverse FFT along the last axis.
+
+		The rows are processed in blocks that fit in cache, so that each block is multiplied
+		by the transfer function and transformed back while it is still in cache, rather than
+		streaming the full spectrum through memory three times.
+
+		Parameters
+		----------
+		f : ndarray
+			The array which is already Fourier transformed along all but the last axis. This
+			is used as a work buffer.
+		adjoint : boolean
+			Whether to use the adjoint of the transfer function.
+
+		Returns
+		-------
+		ndarray
+			The filtered array, inverse Fourier transformed and cropped along the last axis.
+		'''
+		n = self.internal_grid.shape[-1]
+		n_out = self.shape_in[-1]
+
+		tf = self._get_transfer_function(False, f.dtype)
+
+		num_rows = f.shape[-2]
+		row_size = f[..., :1, :].size // f.shape[-1] * n * f.itemsize
+		block_size = max(1, _filter_block_size // row_size)
+
+		res = None
+
+		for i in range(0, num_rows, block_size):
+			rows = slice(i, i + block_size)
+
+			g = _fft_module.fft(f[..., rows, :], n=n, axis=-1, **self._fft_kwargs(overwrite_x=True))
+			_multiply_in_place(g, tf[..., rows, :], adjoint)
+			g = _fft_module.ifft(g, axis=-1, **self._fft_kwargs(overwrite_x=True))
+
+			if res is None:
+				res = np.empty(f.shape[:-1] + (n_out,), dtype=g.dtype)
+			res[..., rows, :] = g[..., :n_out]
+
+		return res
 
-			f = field_dot(tf, f).shaped
+	def _zeropadded_fft(self, f, real=False, skip_last_axis=False):
+		'''Compute the FFT of the zeropadded array `f`, without doing any work on the zeros.
+
+		Filtering is a circular convolution, which commutes with circular shifts.
+		The input can therefore be zeropadded at the end of each axis, rather than
+		around its center, as long as the output is cropped from the same location.
+		This allows the zeropadding to be done by one-dimensional FFTs, of which
+		each pass only operates on the rows that contain non-zero data.
+
+		Parameters
+		----------
+		f : ndarray
+			The shaped input array, without zeropadding.
+		real : boolean
+			Whether to perform a real FFT along the last axis.
+		skip_last_axis : boolean
+			Whether to leave the last axis untransformed. This is ignored for real FFTs.
+
+		Returns
+		-------
+		ndarray
+			The FFT of the zeropadded array.
+		'''
+		ndim = self.input_grid.ndim
+		internal_shape = tuple(self.internal_grid.shape)
+
+		# The first pass must not overwrite the input array; later passes work on temporaries.
+		overwrite_x = False
+
+		if real:
+			f = _real_fft_module.rfft(f, n=internal_shape[-1], axis=-1, **self._fft_kwargs(real=True))
+			overwrite_x = True
+
+			axes = range(-ndim, -1)
+		elif skip_last_axis:
+			axes = range(-ndim, -1)
 		else:
-			# The transfer function is a scalar field.
-			if adjoint:
-				tf = self._transfer_function.conj()
-			else:
-				tf = self._transfer_function
+			axes = range(-ndim, 0)
+
+		for axis in axes:
+			f = _fft_module.fft(f, n=internal_shape[axis], axis=axis, **self._fft_kwargs(overwrite_x))
+			overwrite_x = True
+
+		return f
+
+	def _cropped_ifft(self, f, real=False, skip_last_axis=False):
+		'''Compute the inverse FFT of `f` and crop it to the shape of the input grid.
+
+		This is the counterpart of :meth:`_zeropadded_fft`. Each one-dimensional inverse
+		FFT is immediately cropped, so that subsequent passes operate on fewer rows.
+
+		Parameters
+		----------
+		f : ndarray
+			The spectrum.
+		real : boolean
+			Whether to perform an inverse real FFT along the last axis.
+		skip_last_axis : boolean
+			Whether the last axis is already inverse transformed and cropped. This is
+			ignored for real FFTs.
+
+		Returns
+		-------
+		ndarray
+			The cropped inverse FFT.
+		'''
+		ndim = self.input_grid.ndim
+		internal_shape = tuple(self.internal_grid.shape)
+		shape_in = tuple(self.shape_in)
+
+		if real or skip_last_axis:
+			axes = range(-2, -ndim - 1, -1)
+		else:
+			axes = range(-1, -ndim - 1, -1)
+
+		for axis in axes:
+			f = _fft_module.ifft(f, axis=axis, **self._fft_kwargs(overwrite_x=True))
+
+			crop = [slice(None)] * f.ndim
+			crop[axis] = slice(0, shape_in[axis])
+			f = f[tuple(crop)]
+
+		if real:
+			f = _real_fft_module.irfft(f, n=internal_shape[-1], axis=-1, **self._fft_kwargs(overwrite_x=True, real=True))
+			f = f[..., :shape_in[-1]]
+
+		return f
+
+	def _operation_real(self, field, adjoint):
+		'''The internal filtering operation for real input fields using real FFTs.
 
-			f *= tf
+		This requires the transfer function to be Hermitian.
 
-		if _use_mkl:
-			kwargs = {'overwrite_x': True}
+		Parameters
+		----------
+		field : Field
+			The real-valued input field.
+		adjoint : boolean
+			Whether to perform a forward or adjoint filter.
+
+		Returns
+		-------
+		Field
+			The real-valued filtered field.
+		'''
+		axes = tuple(range(-self.input_grid.ndim, 0))
+
+		if self.cutout is None:
+			f = _real_fft_module.rfftn(field.shaped, axes=axes, **self._fft_kwargs(real=True))
+		else:
+			f = self._zeropadded_fft(field.shaped, real=True)
+
+		tf = self._get_transfer_function(False, f.dtype, real=True)
+		_multiply_in_place(f, tf, adjoint)
+
+		if self.cutout is None:
+			f = _real_fft_module.irfftn(f, s=tuple(self.internal_grid.shape), axes=axes, **self._fft_kwargs(overwrite_x=True, real=True))
 		else:
-			kwargs = {}
-		f = _fft_module.ifftn(f, axes=tuple(range(-self.input_grid.ndim, 0)), **kwargs)
+			f = self._cropped_ifft(f, real=True)
 
 		s = f.shape[:-self.internal_grid.ndim] + (-1,)
+		res = f.reshape(s)
+
+		float_dtype, complex_dtype = _get_float_and_complex_dtype(field.dtype)
+		return Field(res, self.input_grid).astype(float_dtype, copy=False)
+
+	def _operation_cupy(self, field, adjoint):
+		'''The internal filtering operation on the GPU using CuPy.
+
+		Parameters
+		----------
+		field : Field
+			The input field.
+		adjoint : boolean
+			Whether to perform a forward or adjoint filter.
+
+		Returns
+		-------
+		Field
+			The filtered field.
+		'''
+		axes = tuple(range(-self.input_grid.ndim, 0))
+
+		# Zeropad at the end of each axis; see _zeropadded_fft() for why this is allowed.
+		f = cupy.asarray(field.shaped)
+		f = _cupy_fft_module.fftn(f, s=tuple(self.internal_grid.shape), axes=axes, overwrite_x=True)
+
+		f = self._apply_transfer_function(f, adjoint, device=True)
+
+		f = _cupy_fft_module.ifftn(f, axes=axes, overwrite_x=True)
+
+		if self.cutout is not None:
+			crop = (Ellipsis,) + tuple([slice(0, n) for n in self.shape_in])
+			f = f[crop]
+
+		s = f.shape[:-self.internal_grid.ndim] + (-1,)
+		res = cupy.asnumpy(f).reshape(s)
+
+		float_dtype, complex_dtype = _get_float_and_complex_dtype(field.dtype)
+		return Field(res, self.input_grid).astype(complex_dtype, copy=False)
+
+	def _operation_fftw(self, field, adjoint):
+		'''The internal filtering operation using the cached FFTW plans.
+
+		Parameters
+		----------
+		field : Field
+			The input field.
+		adjoint : boolean
+			Whether to perform a forward or adjoint filter.
+
+		Returns
+		-------
+		Field
+			The filtered field.
+		'''
 		if self.cutout is None:
-			res = f.reshape(s)
+			c = Ellipsis
 		else:
-			res = f[c].reshape(s)
+			c = tuple([slice(None)] * field.tensor_order) + self.cutout
+
+		# The zeropadded region of the internal array is never written to. If the buffer
+		# was last used with the same cutout, only the cutout has to be updated.
+		internal_array, padding = _borrow_scratch_buffer(self._internal_shape, self._internal_dtype, c)
+		fft_output, _ = _borrow_scratch_buffer(self._internal_shape, self._internal_dtype)
+
+		if self.cutout is not None and padding != c:
+			_clear_outside_cutout(internal_array, c)
+		internal_array[c] = field.shaped
+
+		f = self._fftw_forward(internal_array, fft_output)
+
+		res = self._apply_transfer_function(f, adjoint)
+		if res is not f:
+			f[:] = res
+
+		f = self._fftw_backward(f, f)
+
+		# Copy the result out of the work buffer, as it will be reused.
+		s = f.shape[:-self.internal_grid.ndim] + (-1,)
+		res = f[c].copy().reshape(s)
+
+		_return_scratch_buffer(internal_array, None if self.cutout is None else c)
+		_return_scratch_buffer(fft_output)
 
 		return Field(res, self.input_grid)
+
+	def _get_transfer_function(self, adjoint, dtype, real=False, device=False):
+		'''Get the transfer function in FFT order, or its adjoint, for a spectrum with data type `dtype`.
+
+		The single-precision version of the transfer function, and the adjoint of a matrix
+		transfer function, are computed on first use and cached, so that filtering does not
+		allocate a cast or transposed copy on every call. The adjoint of a scalar transfer
+		function is not cached; use `_multiply_in_place()` with `conjugate=True` instead.
+
+		Parameters
+		----------
+		adjoint : boolean
+			Whether to return the adjoint of the transfer function. This should only be
+			used for matrix transfer functions.
+		dtype : numpy dtype
+			The data type of the spectrum that will be multiplied by the transfer function.
+		real : boolean
+			Whether to return the part of the transfer function used by real FFTs.
+		device : boolean
+			Whether to return a copy of the transfer function in GPU memory.
+
+		Returns
+		-------
+		ndarray
+			The shaped transfer function or its adjoint.
+		'''
+		float_dtype, complex_dtype = _get_float_and_complex_dtype(dtype)
+		key = (adjoint, real, complex_dtype, device)
+
+		if device:
+			if key not in self._transfer_functions:
+				tf = self._get_transfer_function(adjoint, dtype, real)
+				self._transfer_functions[key] = cupy.asarray(tf)
+
+			return self._transfer_functions[key]
+
+		if key not in self._transfer_functions:
+			if real:
+				tf = self._transfer_function_real
+			else:
+				tf = self._transfer_function
+
+			if adjoint:
+				tf = np.ascontiguousarray(np.swapaxes(tf.conj(), 0, 1))
+
+			if np.iscomplexobj(tf):
+				tf = tf.astype(complex_dtype, copy=False)
+			else:
+				tf = tf.astype(float_dtype, copy=False)
+
+			self._transfer_functions[key] = tf
+
+		return self._transfer_functions[key]
+
+	def _apply_transfer_function(self, f, adjoint, device=False):
+		'''Multiply the Fourier transformed field with the transfer function.
+
+		Parameters
+		----------
+		f : ndarray
+			The Fourier transform of the field. This is modified in-place for
+			scalar transfer functions.
+		adjoint : boolean
+			Whether to use the adjoint of the transfer function.
+		device : boolean
+			Whether `f` is a CuPy array in GPU memory.
+
+		Returns
+		-------
+		ndarray
+			The filtered Fourier transform.
+		'''
+		if (self._transfer_function.ndim - self.internal_grid.ndim) == 2:
+			# The transfer function is a matrix field. Contract directly on the shaped
+			# arrays, rather than going through Field objects and field_dot().
+			tf = self._get_transfer_function(adjoint, f.dtype, device=device)
+			field_tensor_order = f.ndim - self.internal_grid.ndim
+
+			if field_tensor_order == 1:
+				return np.einsum('ij...,j...->i...', tf, f)
+			elif field_tensor_order == 2:
+				return np.einsum('ij...,jk...->ik...', tf, f)
+			else:
+				return tf * f
+		else:
+			# The transfer function is a scalar field.
+			tf = self._get_transfer_function(False, f.dtype, device=device)
+			_multiply_in_place(f, tf, adjoint)
+
+			return f
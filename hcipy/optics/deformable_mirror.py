@@ -7,8 +7,27 @@ try:
 except ImportError:
 	from importlib_resources import files
 
+try:
+	from numba import njit, prange
+
+	@njit(parallel=True, fastmath=True, cache=True)
+	def _numba_phasor(surface, phase_factor):
+		'''Compute exp(1j * phase_factor * surface) in parallel for a real surface.
+		'''
+		res = np.empty(surface.size, dtype=np.complex128)
+
+		for i in prange(surface.size):
+			a = phase_factor * surface[i]
+			res[i] = complex(np.cos(a), np.sin(a))
+
+		return res
+
+	_use_numba = True
+except ImportError:
+	_use_numba = False
+
 from .optical_element import OpticalElement
-from ..field import make_uniform_grid, evaluate_supersampled
+from ..field import Field, make_uniform_grid, evaluate_supersampled
 from ..mode_basis import ModeBasis, make_gaussian_pokes
 from ..interpolation import make_linear_interpolator_separated
 from ..util import read_fits
@@ -135,13 +154,23 @@ def make_xinetics_influence_functions(pupil_grid, num_actuators_across_pupil, ac
 	actuator_grid = make_uniform_grid(actuator.shape, np.array(actuator.shape) * actuator_spacing / 10.0)
 	actuator = make_linear_interpolator_separated(actuator.ravel(), actuator_grid, 0)
 
-	def poke(p):
-		res = csr_matrix(actuator(evaluated_grid.shifted(-p))) / np.cos(x_tilt) * np.cos(y_tilt)
-		res.eliminate_zeros()
+	# Build the sparse matrix of all modes directly, rather than stacking a sparse matrix per actuator.
+	data = []
+	indices = []
+	indptr = [0]
 
-		return res
+	for p in actuator_positions.points:
+		poke = actuator(evaluated_grid.shifted(-p))
+		nonzero = np.flatnonzero(poke)
+
+		data.append(poke[nonzero])
+		indices.append(nonzero)
+		indptr.append(indptr[-1] + nonzero.size)
+
+	data = np.concatenate(data) / np.cos(x_tilt) * np.cos(y_tilt)
+	modes = csr_matrix((data, np.concatenate(indices), indptr), shape=(actuator_positions.size, pupil_grid.size))
 
-	return ModeBasis([poke(p) for p in actuator_positions.points], pupil_grid)
+	return ModeBasis(modes.T, pupil_grid)
 
 def find_illuminated_actuators(basis, aperture, power_cutoff=0.1):
 	'''Find the illuminated modes.
@@ -162,8 +191,22 @@ def find_illuminated_actuators(basis, aperture, power_cutoff=0.1):
 	ModeBasis
 		The illuminated influence functions.
 	'''
-	total_power = np.sum(abs(basis._transformation_matrix)**2, axis=0)
-	masked_power = np.sum(abs(basis._transformation_matrix[aperture > 0])**2, axis=0)
+	T = basis._transformation_matrix
+
+	# Compute the power in each pixel for each mode in a single pass.
+	if basis.is_sparse:
+		power = abs(T).power(2)
+	elif np.iscomplexobj(T):
+		power = ne.evaluate('real(T * conj(T))', local_dict={'T': T})
+	else:
+		power = ne.evaluate('T * T', local_dict={'T': T})
+
+	# Sum the power over the aperture with a matrix-vector product, rather than indexing the rows.
+	mask = np.asarray(aperture > 0, dtype='float')
+
+	total_power = np.asarray(power.sum(axis=0)).ravel()
+	masked_power = np.asarray(power.T.dot(mask)).ravel()
+
 	illuminated_actuator_mask = masked_power >= (power_cutoff * total_power)
 
 	return ModeBasis(basis._transformation_matrix[:, illuminated_actuator_mask], basis.grid)
@@ -174,13 +217,31 @@ class DeformableMirror(OpticalElement):
 	This class does not contain any temporal simulation (ie. settling time),
 	and assumes that there is no crosstalk between actuators.
 
+	The complex phasor applied to a wavefront is cached for each wavelength and
+	propagation direction, and is reused for as long as the actuators do not change.
+	Each cached phasor is a complex128 array the size of the pupil grid, which is
+	16 MB for a 1024x1024 grid. If Numba is installed, the phasor is computed with
+	a parallelized compiled kernel.
+
 	Parameters
 	----------
 	influence_functions : ModeBasis
 		The influence function for each of the actuators.
+	max_phasors_in_cache : int
+		The maximum number of phasors to cache. The default of two caches one forward
+		and one backward propagation for a single wavelength. Increase this when
+		propagating multiple wavelengths through the same surface, at the memory cost
+		mentioned above. When the cache is full, the oldest phasor is removed. A value
+		of zero disables the cache.
 	'''
-	def __init__(self, influence_functions):
+	_max_phasors_in_cache = 2
+
+	# Subclasses can set the actuators before the influence functions are set.
+	_actuators_version = 0
+
+	def __init__(self, influence_functions, max_phasors_in_cache=2):
 		self.influence_functions = influence_functions
+		self.max_phasors_in_cache = max_phasors_in_cache
 
 		self.actuators = np.zeros(len(influence_functions))
 		self._actuators_for_cached_surface = None
@@ -199,6 +260,7 @@ class DeformableMirror(OpticalElement):
 	@actuators.setter
 	def actuators(self, actuators):
 		self._actuators = actuators
+		self._actuators_version += 1
 
 	def forward(self, wavefront):
 		'''Propagate a wavefront through the deformable mirror.
@@ -214,9 +276,7 @@ class DeformableMirror(OpticalElement):
 			The reflected wavefront.
 		'''
 		wf = wavefront.copy()
-
-		variables = {'alpha': 2j * wavefront.wavenumber, 'surf': self.surface}
-		wf.electric_field *= ne.evaluate('exp(alpha * surf)', local_dict=variables)
+		wf.electric_field *= self._get_phasor(2j * wavefront.wavenumber)
 
 		return wf
 
@@ -234,12 +294,67 @@ class DeformableMirror(OpticalElement):
 			The reflected wavefront.
 		'''
 		wf = wavefront.copy()
-
-		variables = {'alpha': -2j * wavefront.wavenumber, 'surf': self.surface}
-		wf.electric_field *= ne.evaluate('exp(alpha * surf)', local_dict=variables)
+		wf.electric_field *= self._get_phasor(-2j * wavefront.wavenumber)
 
 		return wf
 
+	def _get_phasor(self, alpha):
+		'''Get the complex phasor exp(alpha * surface) of the current surface.
+
+		The phasors are cached for each value of `alpha`, and reused for as long as
+		the surface of the deformable mirror does not change.
+
+		Parameters
+		----------
+		alpha : complex
+			The factor with which to multiply the surface inside the exponent.
+
+		Returns
+		-------
+		Field
+			The complex phasor.
+		'''
+		# Retrieve the surface first, as recomputing it clears the phasor cache.
+		surface = self.surface
+
+		if alpha in self._phasor_cache:
+			return self._phasor_cache[alpha]
+
+		if _use_numba and alpha.real == 0 and surface.dtype == np.float64:
+			phasor = _numba_phasor(np.ascontiguousarray(surface), alpha.imag)
+		else:
+			variables = {'alpha': alpha, 'surf': surface}
+			phasor = ne.evaluate('exp(alpha * surf)', local_dict=variables)
+
+		if self.max_phasors_in_cache > 0:
+			self._trim_phasor_cache(self.max_phasors_in_cache - 1)
+			self._phasor_cache[alpha] = phasor
+
+		return phasor
+
+	def _trim_phasor_cache(self, max_size):
+		'''Remove the oldest phasors from the cache until it holds at most `max_size` phasors.
+
+		Parameters
+		----------
+		max_size : int
+			The maximum number of phasors to keep.
+		'''
+		while len(self._phasor_cache) > max(max_size, 0):
+			del self._phasor_cache[next(iter(self._phasor_cache))]
+
+	@property
+	def max_phasors_in_cache(self):
+		'''The maximum number of phasors that are cached.
+		'''
+		return self._max_phasors_in_cache
+
+	@max_phasors_in_cache.setter
+	def max_phasors_in_cache(self, max_phasors_in_cache):
+		self._max_phasors_in_cache = int(max_phasors_in_cache)
+
+		self._trim_phasor_cache(self._max_phasors_in_cache)
+
 	@property
 	def influence_functions(self):
 		'''The influence function for each of the actuators of this deformable mirror.
@@ -250,17 +365,29 @@ class DeformableMirror(OpticalElement):
 	def influence_functions(self, influence_functions):
 		self._influence_functions = influence_functions
 		self._actuators_for_cached_surface = None
+		self._actuators_version = 0
+		self._phasor_cache = {}
+
+		# Sparse influence functions are stored in CSR format for fast matrix-vector products.
+		if influence_functions.is_sparse:
+			self._influence_matrix = influence_functions.transformation_matrix.tocsr()
+		else:
+			self._influence_matrix = influence_functions.transformation_matrix
 
 	@property
 	def surface(self):
 		'''The surface of the deformable mirror in meters.
 		'''
-		if self._actuators_for_cached_surface is not None:
-			if np.all(self.actuators == self._actuators_for_cached_surface):
+		# Assigning new actuators always invalidates the cached surface. If nothing was
+		# assigned, the actuators may still have been modified in-place.
+		if self._actuators_for_cached_surface is not None and self._actuators_version == self._actuators_version_for_cached_surface:
+			if np.array_equal(self.actuators, self._actuators_for_cached_surface):
 				return self._surface
 
-		self._surface = self.influence_functions.linear_combination(self.actuators)
+		self._surface = Field(self._influence_matrix.dot(self.actuators), self.influence_functions.grid)
 		self._actuators_for_cached_surface = self.actuators.copy()
+		self._actuators_version_for_cached_surface = self._actuators_version
+		self._phasor_cache = {}
 
 		return self._surface
 
@@ -279,7 +406,7 @@ class DeformableMirror(OpticalElement):
 		rms : scalar
 			The dm surface rms.
 		'''
-		self._actuators = np.random.randn(self._actuators.size) * rms
+		self.actuators = np.random.randn(self._actuators.size) * rms
 
 	def phase_for(self, wavelength):
 		'''Get the phase in radians that is added to a wavefront with a specified wavelength.
@@ -299,7 +426,7 @@ class DeformableMirror(OpticalElement):
 	def flatten(self):
 		'''Flatten the DM by setting all actuators to zero.
 		'''
-		self._actuators = np.zeros(len(self.influence_functions))
+		self.actuators = np.zeros(len(self.influence_functions))
 
 def label_actuator_centroid_positions(influence_functions, label_format='{:d}', **text_kwargs):
 	'''Display centroid positions for a set of influence functions.
@@ -334,9 +461,12 @@ def label_actuator_centroid_positions(influence_functions, label_format='{:d}',
 	kwargs = {'verticalalignment': 'center', 'horizontalalignment': 'center'}
 	kwargs.update(text_kwargs)
 
-	for i, act in enumerate(influence_functions):
-		x_pos = (act * x).sum() / act.sum()
-		y_pos = (act * y).sum() / act.sum()
-		pos = (x_pos, y_pos)
+	# Compute all centroids at once using matrix-vector products with the transformation matrix.
+	T = influence_functions.transformation_matrix
+
+	weights = np.asarray(T.sum(axis=0)).ravel()
+	x_pos = T.T.dot(x) / weights
+	y_pos = T.T.dot(y) / weights
 
+	for i, pos in enumerate(zip(x_pos, y_pos)):
 		plt.annotate(label_format.format(i), xy=pos, **kwargs)
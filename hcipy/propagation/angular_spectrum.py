@@ -1,4 +1,5 @@
 import numpy as np
+import numexpr as ne
 
 from ..optics import Wavefront, AgnosticOpticalElement, make_agnostic_forward, make_agnostic_backward
 from ..field import Field, evaluate_supersampled
@@ -55,21 +56,33 @@ class AngularSpectrumPropagator(AgnosticOpticalElement):
 				fft_upscale = FastFourierTransform(enlarged_grid)
 
 				def impulse_response(grid):
-					r_squared = grid.x**2 + grid.y**2 + self.distance**2
-					r = np.sqrt(r_squared)
-					cos_theta = self.distance / r
+					# Evaluate using NumExpr to avoid large temporary arrays.
+					variables = {'x': grid.x, 'y': grid.y, 'd': self.distance}
+					r = ne.evaluate('sqrt(x * x + y * y + d * d)', local_dict=variables)
 
-					return Field(cos_theta / (2 * np.pi) * np.exp(1j * k * r) * (1 / r_squared - 1j * k / r), grid)
+					variables = {'r': r, 'alpha': 1j * k, 'norm': self.distance / (2 * np.pi)}
+					ir = ne.evaluate('norm / r * exp(alpha * r) * (1 / (r * r) - alpha / r)', local_dict=variables)
+
+					return Field(ir, grid)
 
 				impulse_response = evaluate_supersampled(impulse_response, enlarged_grid, self.num_oversampling)
 
 				return fft_upscale.forward(impulse_response)
 		else:
 			def transfer_function_native(fourier_grid):
-				k_squared = fourier_grid.as_('polar').r**2
-				k_z = np.sqrt(k**2 - k_squared + 0j)
-
-				return Field(np.exp(1j * k_z * self.distance), fourier_grid)
+				# Broadcast the separated coordinates in NumExpr to avoid computing
+				# a full polar grid and the temporary arrays for k_z.
+				kx, ky = fourier_grid.separated_coords
+
+				variables = {
+					'kx': kx[np.newaxis, :],
+					'ky': ky[:, np.newaxis],
+					'k_squared': k**2 + 0j,
+					'alpha': 1j * self.distance
+				}
+				tf = ne.evaluate('exp(alpha * sqrt(k_squared - kx * kx - ky * ky))', local_dict=variables)
+
+				return Field(tf.ravel(), fourier_grid)
 
 			def transfer_function(fourier_grid):
 				return evaluate_supersampled(transfer_function_native, fourier_grid, self.num_oversampling)
@@ -1,5 +1,3 @@
-import numpy as np
-
 def inverse_truncated_modal(M, num_modes, svd=None):
 	'''Invert `M` with `num_modes` modes.
 
@@ -61,12 +59,9 @@ def inverse_truncated(M, rcond=1e-15, svd=None):
 	'''
 	if svd is None:
 		from .singular_value_decomposition import SVD
-		svd = SVD(M)
+		svd = SVD(M, rcond=rcond)
 
-	U, S, Vt = svd.svd
-	S_inv = np.array([1 / s if abs(s) > (rcond * S.max()) else 0 for s in S])
-
-	return (Vt.T * S_inv).dot(U.T)
+	return svd.pseudo_inverse(rcond)
 
 def inverse_tikhonov(M, rcond=1e-15, svd=None):
 	'''Invert `M` using Tikhonov regularization.
@@ -1,8 +1,389 @@
+import warnings
+
 import numpy as np
+import scipy.linalg
 import scipy.sparse
 import scipy.sparse.linalg
 
 from ..mode_basis import ModeBasis
+from ..config import Configuration
+
+try:
+	import cupy
+	_cupy_available = True
+except ImportError:
+	_cupy_available = False
+
+def _dense_svd(matrix, compute_uv=True, overwrite_a=False, use_cupy=False):
+	'''Compute the economic SVD of a dense matrix using LAPACK.
+
+	The divide-and-conquer driver (gesdd) is used, as it is much faster than the standard
+	driver (gesvd). If it fails to converge, which can happen for pathological matrices,
+	the standard driver is used instead.
+
+	Alternatively, the SVD can be computed on the GPU using CuPy, after which the
+	results are copied back to the CPU.
+
+	Parameters
+	----------
+	matrix : ndarray
+		The matrix on which to perform the SVD.
+	compute_uv : boolean
+		Whether to compute the singular vectors in addition to the singular values.
+	overwrite_a : boolean
+		Whether the matrix may be overwritten during the computation.
+	use_cupy : boolean
+		Whether to compute the SVD on the GPU using CuPy.
+
+	Returns
+	-------
+	tuple or ndarray
+		The U, S and V^T matrices, or only S if `compute_uv` is False.
+
+	Raises
+	------
+	LinAlgError
+		If the SVD did not converge.
+	'''
+	if use_cupy:
+		res = cupy.linalg.svd(cupy.asarray(matrix), full_matrices=False, compute_uv=compute_uv)
+
+		if compute_uv:
+			return tuple(cupy.asnumpy(x) for x in res)
+		else:
+			return cupy.asnumpy(res)
+
+	original = np.asarray(matrix)
+	transposed = False
+
+	# LAPACK does not reliably report non-finite values, and this check is cheap
+	# compared to the SVD itself.
+	if not np.isfinite(original).all():
+		raise np.linalg.LinAlgError('SVD did not converge: the matrix contains infs or NaNs.')
+
+	# LAPACK works in-place on Fortran-ordered matrices. Any other matrix would be
+	# copied internally, so make that copy explicitly and let LAPACK overwrite it.
+	if not overwrite_a:
+		matrix = np.array(original, order='F')
+	elif original.flags.c_contiguous and not original.flags.f_contiguous:
+		# The transpose of a C-ordered matrix is Fortran-ordered, so decompose that instead.
+		matrix = original.T
+		transposed = True
+	else:
+		matrix = original
+
+	gesdd, lwork = _get_gesdd(matrix, compute_uv)
+
+	u, s, vt, info = gesdd(matrix, compute_uv=compute_uv, lwork=lwork, full_matrices=False, overwrite_a=True)
+
+	if info < 0:
+		raise ValueError('Illegal value in argument %d of internal gesdd.' % -info)
+
+	if info > 0:
+		if overwrite_a:
+			# The matrix may have been destroyed, so we cannot try again.
+			raise np.linalg.LinAlgError('SVD did not converge.')
+
+		return scipy.linalg.svd(original, full_matrices=False, compute_uv=compute_uv, check_finite=False, lapack_driver='gesvd')
+
+	if not compute_uv:
+		return s
+
+	if transposed:
+		# The SVD of the transpose is V S U^T.
+		return vt.T, s, u.T
+	else:
+		return u, s, vt
+
+_gesdd_cache = {}
+
+def _get_gesdd(matrix, compute_uv):
+	'''Get the LAPACK gesdd routine and its optimal workspace size for a matrix.
+
+	Both are cached by shape and dtype, so that repeated SVDs of same-shape matrices,
+	as are common during iterative calibration, skip the LAPACK lookup and workspace query.
+
+	Parameters
+	----------
+	matrix : ndarray
+		The matrix on which the SVD will be performed.
+	compute_uv : boolean
+		Whether the singular vectors will be computed.
+
+	Returns
+	-------
+	gesdd : function
+		The LAPACK gesdd routine for the dtype of `matrix`.
+	lwork : int
+		The optimal size of the workspace.
+	'''
+	key = (matrix.shape, matrix.dtype, compute_uv)
+
+	if key not in _gesdd_cache:
+		gesdd, gesdd_lwork = scipy.linalg.get_lapack_funcs(('gesdd', 'gesdd_lwork'), (matrix,), ilp64='preferred')
+
+		m, n = matrix.shape
+		work, info = gesdd_lwork(m, n, compute_uv=compute_uv, full_matrices=False)
+
+		if info != 0:
+			raise ValueError('Internal work array size computation failed: %d.' % info)
+
+		# The workspace size is returned as a float, which could have been rounded down.
+		lwork = int(np.ceil(np.nextafter(np.float32(np.real(work)), np.float32(np.inf))))
+
+		_gesdd_cache[key] = (gesdd, max(lwork, 1))
+
+	return _gesdd_cache[key]
+
+def _orthonormalize(Y):
+	'''Compute an orthonormal basis for the columns of `Y`.
+
+	Parameters
+	----------
+	Y : ndarray
+		The matrix to orthonormalize. This is overwritten.
+
+	Returns
+	-------
+	ndarray
+		The orthonormal basis, as the Q matrix of the economic QR decomposition of `Y`.
+	'''
+	Q, _ = scipy.linalg.qr(Y, mode='economic', overwrite_a=True, check_finite=False)
+
+	return Q
+
+def _randomized_svd(matrix, num_modes, num_oversampling=10, num_power_iterations=2, rng=None):
+	'''Compute a truncated SVD using a randomized range finder.
+
+	The range of the matrix is sampled with a random Gaussian matrix, after which
+	the matrix is projected onto an orthonormal basis for that range. The SVD of the
+	much smaller projected matrix then yields the truncated SVD of the original
+	matrix. This algorithm is described in [Halko2011]_.
+
+	.. [Halko2011] N. Halko, P. G. Martinsson and J. A. Tropp 2011, "Finding Structure
+		with Randomness: Probabilistic Algorithms for Constructing Approximate Matrix
+		Decompositions", SIAM Review 53, 217-288 (2011)
+
+	Parameters
+	----------
+	matrix : ndarray or any sparse matrix
+		The matrix on which to perform the SVD.
+	num_modes : int
+		The number of singular values and modes to calculate.
+	num_oversampling : int
+		The number of additional random samples of the range of the matrix.
+	num_power_iterations : int
+		The number of power iterations, which improve the accuracy for matrices
+		with slowly decaying singular values.
+	rng : numpy.random.Generator or None
+		The random number generator used to sample the range of the matrix. If this
+		is None, a new unseeded generator is used.
+
+	Returns
+	-------
+	U : ndarray
+		The left singular vectors.
+	S : ndarray
+		The singular values in descending order.
+	Vt : ndarray
+		The right singular vectors.
+	'''
+	rng = np.random.default_rng(rng)
+
+	m, n = matrix.shape
+	num_samples = min(num_modes + num_oversampling, m, n)
+
+	# Sample the range of the matrix, keeping the precision of the matrix.
+	float_dtype = np.finfo(np.result_type(matrix.dtype, np.float32)).dtype
+	omega = rng.standard_normal((n, num_samples), dtype=float_dtype)
+	Q = _orthonormalize(matrix.dot(omega))
+
+	for i in range(num_power_iterations):
+		# Multiply by the conjugate transpose without forming it. Both products are
+		# orthonormalized to avoid losing the small singular values to round-off errors.
+		Z = _orthonormalize(matrix.T.dot(Q.conj()).conj())
+		Q = _orthonormalize(matrix.dot(Z))
+
+	# Project the matrix onto the basis for its range and decompose the result.
+	B = matrix.T.dot(Q.conj()).T
+	U_B, S, Vt = _dense_svd(B, overwrite_a=True)
+	U = Q.dot(U_B)
+
+	return U[:, :num_modes], S[:num_modes], Vt[:num_modes]
+
+def _hermitian_svd(matrix, num_modes=None, compute_uv=True, overwrite_a=False, rng=None):
+	'''Compute the SVD of a Hermitian positive semi-definite matrix from its eigendecomposition.
+
+	For such a matrix, the singular values are its eigenvalues, and both the left and right
+	singular vectors are its eigenvectors. All eigenpairs are computed with LAPACK, which is
+	much faster than a full SVD. A limited number of eigenpairs is computed with LOBPCG.
+
+	Parameters
+	----------
+	matrix : ndarray or any sparse matrix
+		The Hermitian positive semi-definite matrix on which to perform the SVD. This is not checked.
+	num_modes : int or None
+		The number of singular values and modes to calculate. If this is None, all modes are
+		computed, which requires a dense matrix.
+	compute_uv : boolean
+		Whether to compute the singular vectors in addition to the singular values.
+	overwrite_a : boolean
+		Whether the matrix may be overwritten when computing all modes.
+	rng : numpy.random.Generator or None
+		The random number generator for the initial guess of LOBPCG. If this is None,
+		a new unseeded generator is used.
+
+	Returns
+	-------
+	tuple or ndarray
+		The U, S and V^T matrices, or only S if `compute_uv` is False.
+	'''
+	if num_modes is not None:
+		rng = np.random.default_rng(rng)
+
+		float_dtype = np.finfo(np.result_type(matrix.dtype, np.float32)).dtype
+		X = rng.standard_normal((matrix.shape[0], num_modes), dtype=float_dtype)
+
+		# The default tolerance is too loose for accurate eigenvectors. The largest diagonal
+		# element sets the scale, as it bounds the largest eigenvalue from below.
+		tol = np.sqrt(np.finfo(float_dtype).eps) * np.max(np.abs(matrix.diagonal()))
+
+		w, v = scipy.sparse.linalg.lobpcg(matrix, X, tol=tol, maxiter=100, largest=True)
+	elif compute_uv:
+		w, v = scipy.linalg.eigh(matrix, overwrite_a=overwrite_a, check_finite=False)
+	else:
+		w = scipy.linalg.eigh(matrix, eigvals_only=True, overwrite_a=overwrite_a, check_finite=False)
+
+	# Round-off errors can make eigenvalues slightly negative. The sign of
+	# such an eigenvalue is moved into the right singular vector.
+	S = np.abs(w)
+	order = np.argsort(S)[::-1]
+	S = S[order]
+
+	if not compute_uv:
+		return S
+
+	U = np.ascontiguousarray(v[:, order])
+	Vt = U.conj().T * np.where(w[order] < 0, -1, 1)[:, np.newaxis]
+
+	return U, S, np.ascontiguousarray(Vt)
+
+def _make_read_only(arr):
+	'''Make a C-contiguous, read-only version of an array.
+
+	This ensures that results that are cached cannot be corrupted by accidental
+	in-place modifications, and that subsequent matrix products use optimal strides.
+
+	Parameters
+	----------
+	arr : ndarray
+		The array to make read-only. This is copied only if it is not C-contiguous.
+
+	Returns
+	-------
+	ndarray
+		The C-contiguous, read-only array.
+	'''
+	arr = np.ascontiguousarray(arr)
+	arr.setflags(write=False)
+
+	return arr
+
+def _as_matrix(matrix):
+	'''Convert an array-like to an ndarray, leaving arrays and sparse matrices untouched.
+
+	Parameters
+	----------
+	matrix : array_like or any sparse matrix
+		The matrix.
+
+	Returns
+	-------
+	ndarray or any sparse matrix
+		The matrix as an array, or the sparse matrix itself.
+	'''
+	if scipy.sparse.issparse(matrix) or isinstance(matrix, np.ndarray):
+		return matrix
+
+	return np.asarray(matrix)
+
+_max_dense_diagonal_check_size = 512
+
+def _is_diagonal(matrix):
+	'''Check cheaply whether a matrix is diagonal.
+
+	Sparse matrices are only recognized when stored in DIA format with only the main diagonal.
+	Dense matrices are only checked when they are small, to avoid overhead for large matrices.
+
+	Parameters
+	----------
+	matrix : ndarray or any sparse matrix
+		The matrix to check.
+
+	Returns
+	-------
+	boolean
+		Whether the matrix is known to be diagonal.
+	'''
+	if scipy.sparse.issparse(matrix):
+		return matrix.format == 'dia' and len(matrix.offsets) == 1 and matrix.offsets[0] == 0
+
+	if max(matrix.shape) >= _max_dense_diagonal_check_size:
+		return False
+
+	# All nonzero elements must lie on the diagonal.
+	return np.count_nonzero(matrix) == np.count_nonzero(matrix.diagonal())
+
+def _diagonal_svd(matrix, num_modes=None, compute_uv=True):
+	'''Compute the SVD of a diagonal matrix without any decomposition.
+
+	The singular values are the absolute values of the diagonal elements. The singular
+	vectors are unit vectors, where the phase of each diagonal element is put in V^T.
+
+	Parameters
+	----------
+	matrix : ndarray or any sparse matrix
+		The diagonal matrix on which to perform the SVD.
+	num_modes : int or None
+		The number of singular values and modes to return. If this is None, all modes
+		are returned.
+	compute_uv : boolean
+		Whether to compute the singular vectors in addition to the singular values.
+
+	Returns
+	-------
+	tuple or ndarray
+		The U, S and V^T matrices, or only S if `compute_uv` is False.
+	'''
+	d = np.asarray(matrix.diagonal()).ravel()
+
+	# Integer matrices have floating-point singular values and modes.
+	if not np.issubdtype(d.dtype, np.inexact):
+		d = d.astype(np.float64)
+
+	S = np.abs(d)
+
+	order = np.argsort(S, kind='stable')[::-1][:num_modes]
+	S = S[order]
+
+	if not compute_uv:
+		return S
+
+	m, n = matrix.shape
+	modes = np.arange(len(order))
+
+	U = np.zeros((m, len(order)), dtype=d.dtype)
+	U[order, modes] = 1
+
+	# Zero diagonal elements get a phase of one.
+	phase = np.ones_like(d[order])
+	nonzero = S > 0
+	phase[nonzero] = d[order][nonzero] / S[nonzero]
+
+	Vt = np.zeros((len(order), n), dtype=d.dtype)
+	Vt[modes, order] = phase
+
+	return U, S, Vt
 
 class SVD(object):
 	'''The Singular Value Decomposition for the provided matrix.
@@ -14,7 +395,23 @@ class SVD(object):
 	When a sparse matrix is passed, and no number of modes is given, all but one
 	mode will be calculated. The reason is that the sparse SVD implementation in Scipy
 	doesn't allow calculation of all modes. If all modes are required, the user
-	must pass a densified version of the matrix (ie. `matrix.toarray()`).
+	must pass a densified version of the matrix (ie. `matrix.toarray()`). As this is
+	very slow, a warning is emitted in this case.
+
+	When only a small number of modes is requested, a randomized SVD can be used
+	instead of the iterative sparse SVD. This is much faster, but loses accuracy for
+	matrices with slowly decaying singular values, so it has to be requested explicitly.
+
+	The decomposition is computed lazily on first access. If only the singular values
+	are accessed, the singular vectors are not computed at all.
+
+	The singular values, and the corresponding modes, are always sorted in descending
+	order, regardless of the algorithm that was used. The U, S and V^T matrices are
+	C-contiguous and read-only, as they are cached. Copy them before modifying them.
+
+	Diagonal matrices are decomposed directly, without calling LAPACK or ARPACK. This is
+	detected for sparse matrices in DIA format with only a main diagonal, and for small
+	dense matrices.
 
 	Parameters
 	----------
@@ -24,43 +421,365 @@ class SVD(object):
 		The number of singular values and modes to calculate. If this is None,
 		and `matrix` is not sparse, all modes will be computed. If this is None and
 		`matrix` is sparse, all but one mode will be computed.
+	method : {'arpack', 'randomized'}
+		The algorithm to use when computing a limited number of modes. 'arpack' uses the
+		iterative sparse SVD from Scipy, which is accurate for any matrix. 'randomized' uses a
+		randomized SVD, which is much faster when few modes are requested, but is only accurate
+		for matrices with quickly decaying singular values. It works for both dense and sparse
+		matrices. This is ignored when all modes are computed.
+	overwrite_a : boolean
+		Whether the matrix may be overwritten when computing the SVD of a dense matrix. This
+		avoids a copy of the matrix, but its contents are undefined afterwards.
+	dtype : data-type or None
+		The data type in which to compute the SVD. If this is None, the data type of the
+		matrix is used. Computing the SVD of a double-precision matrix in single precision
+		(ie. float32 or complex64) halves the memory usage and is roughly twice as fast,
+		but the singular values and modes are only accurate to about 1e-7 relative to the
+		largest singular value. This is not recommended for matrices with a condition
+		number larger than about 1e6.
+	use_cupy : boolean or None
+		Whether to compute the SVD on the GPU using CuPy. This is only done when all modes of a
+		dense matrix are computed, and is ignored if CuPy is not installed. This is only faster
+		than the CPU for large matrices. If this is None, the choice will be determined by the
+		configuration file.
+	num_oversampling : int
+		The number of additional random samples of the range of the matrix for the
+		randomized SVD. This is ignored for other methods.
+	num_power_iterations : int
+		The number of power iterations for the randomized SVD. More iterations improve the
+		accuracy for matrices with slowly decaying singular values, at the cost of two
+		additional matrix products per iteration. This is ignored for other methods.
+	seed : None, int or numpy.random.Generator
+		The seed for the random numbers used by the randomized SVD and by LOBPCG. Pass an
+		integer to make their results reproducible. If this is None, the results will differ
+		slightly between runs.
+	warm_start : ndarray or None
+		The starting vector for the ARPACK iterations, of length `min(matrix.shape)`. A
+		starting vector close to the span of the requested singular vectors reduces the
+		number of iterations. See `SVD.from_previous()` for a convenient way to obtain this
+		from a previous SVD of a similar matrix. This is ignored for other methods.
+	rcond : scalar or None
+		If this is given, all modes with a singular value lower than `rcond` times the maximum
+		singular value are discarded after the decomposition. This reduces the memory usage,
+		and makes subsequent operations, such as the pseudo-inverse, scale with the effective
+		rank of the matrix rather than with `num_modes`. If this is None, all computed modes
+		are kept.
+	hint : {None, 'spd'}
+		A hint about the structure of the matrix. If this is 'spd', the matrix is assumed to be
+		symmetric (or Hermitian) positive semi-definite, such as a covariance or Gram matrix. The
+		SVD is then computed from the eigendecomposition, which is equivalent and cheaper: the
+		singular values are the eigenvalues, and U and V are both the eigenvectors. All modes are
+		computed with LAPACK (eigh), and a limited number of modes with LOBPCG, regardless of
+		`method`. The structure of the matrix is not checked.
+
+	Raises
+	------
+	ValueError
+		If no matrix was supplied or if the method or hint is not recognized.
 	'''
-	def __init__(self, matrix=None, num_modes=None, M=None):
+	def __init__(self, matrix=None, num_modes=None, M=None, method='arpack', overwrite_a=False, dtype=None, use_cupy=None, num_oversampling=10, num_power_iterations=2, warm_start=None, hint=None, rcond=None, seed=None):
 		if matrix is None:
-			import warnings
-			warnings.warn('Deprecated: use "matrix" instead of "M".', DeprecationWarning, stacklevel=2)
-			matrix = M
+			matrix = self._resolve_matrix(M)
 
-		if matrix is None:
-			raise ValueError('You need to supply a matrix.')
+		matrix = _as_matrix(matrix)
 
 		self._matrix = matrix
-		self._num_modes = num_modes
+		self._num_modes = None if num_modes is None else int(num_modes)
 
 		is_sparse = scipy.sparse.issparse(matrix)
+		self._is_diagonal = _is_diagonal(matrix)
+
+		if is_sparse and self.num_modes is None and not self._is_diagonal:
+			warnings.warn('Computing all but one mode of a sparse matrix is slow. Specify num_modes or use a dense matrix (matrix.toarray()) instead.', stacklevel=2)
 
-		if is_sparse and self.num_modes is None:
 			self._num_modes = min(matrix.shape) - 1
 
-		if self.num_modes is None:
-			self._svd = np.linalg.svd(matrix, full_matrices=False)
+		if method not in ['arpack', 'randomized']:
+			raise ValueError('Method "%s" is not recognized.' % method)
+
+		if hint not in [None, 'spd']:
+			raise ValueError('Hint "%s" is not recognized.' % hint)
+
+		self._method = method
+		self._hint = hint
+		self._rcond = rcond
+		self._num_oversampling = num_oversampling
+		self._num_power_iterations = num_power_iterations
+		self._seed = seed
+		self._warm_start = warm_start
+		self._overwrite_a = overwrite_a
+		self._dtype = None if dtype is None else np.dtype(dtype)
+
+		# Get the value from the configuration file if left at the default.
+		if use_cupy is None:
+			use_cupy = Configuration().util.svd.use_cupy
+		self._use_cupy = use_cupy and _cupy_available
+
+		self._svd = None
+		self._singular_values = None
+
+		self._left_singular_modes = None
+		self._right_singular_modes = None
+
+	@staticmethod
+	def _resolve_matrix(M):
+		'''Get the matrix from the deprecated `M` argument.
+
+		Parameters
+		----------
+		M : ndarray or any sparse matrix or None
+			The matrix supplied with the deprecated argument.
+
+		Returns
+		-------
+		ndarray or any sparse matrix
+			The matrix on which to perform the SVD.
+
+		Raises
+		------
+		ValueError
+			If no matrix was supplied.
+		'''
+		if M is None:
+			raise ValueError('You need to supply a matrix.')
+
+		warnings.warn('Deprecated: use "matrix" instead of "M".', DeprecationWarning, stacklevel=3)
+
+		return M
+
+	@classmethod
+	def from_previous(cls, matrix, previous_svd, **kwargs):
+		'''Compute the SVD of a matrix, warm-started from the SVD of a similar matrix.
+
+		This is useful when the SVD of a slowly-varying matrix is recomputed, for example
+		in calibration loops. The ARPACK iterations are started from the sum of the previous
+		singular vectors, so that they start out close to the span of the new ones.
+
+		Parameters
+		----------
+		matrix : ndarray or any sparse matrix
+			The matrix on which to perform the SVD. This must have the same shape as the
+			matrix of `previous_svd`.
+		previous_svd : SVD
+			The SVD of a similar matrix.
+		**kwargs
+			Any other arguments are passed to the constructor. By default, the same number
+			of modes as `previous_svd` is computed using ARPACK, as the other methods do not
+			use the starting vector.
+
+		Returns
+		-------
+		SVD
+			The (lazily computed) SVD of `matrix`.
+
+		Raises
+		------
+		ValueError
+			If the matrix does not have the same shape as that of the previous SVD.
+		'''
+		matrix = _as_matrix(matrix)
+
+		if matrix.shape != previous_svd.matrix.shape:
+			raise ValueError('The matrix must have the same shape as that of the previous SVD.')
+
+		kwargs.setdefault('num_modes', previous_svd.num_modes)
+		kwargs.setdefault('method', 'arpack')
+
+		# Avoid computing the previous SVD if a starting vector was supplied.
+		if 'warm_start' not in kwargs:
+			kwargs['warm_start'] = previous_svd._get_warm_start()
+
+		return cls(matrix, **kwargs)
+
+	@classmethod
+	def batch(cls, matrices, num_modes=None):
+		'''Compute the SVDs of a stack of dense matrices at once.
+
+		All decompositions are done in a single call to LAPACK through Numpy, which avoids
+		the Python overhead of decomposing many small matrices one at a time. The returned
+		SVDs share their U, S and V^T matrices with the stacked result, so no per-matrix
+		copies are made.
+
+		Parameters
+		----------
+		matrices : ndarray
+			The stack of matrices, with shape (N, m, n).
+		num_modes : int or None
+			The number of singular values and modes to keep for each matrix. If this is
+			None, all modes will be kept.
+
+		Returns
+		-------
+		list of SVD
+			The SVD of each of the matrices.
+
+		Raises
+		------
+		ValueError
+			If `matrices` is not three-dimensional.
+		'''
+		matrices = np.asarray(matrices)
+
+		if matrices.ndim != 3:
+			raise ValueError('The stack of matrices must be three-dimensional.')
+
+		U, S, Vt = np.linalg.svd(matrices, full_matrices=False)
+
+		if num_modes is not None:
+			num_modes = int(num_modes)
+			U, S, Vt = U[:, :, :num_modes], S[:, :num_modes], Vt[:, :num_modes]
+
+		U, S, Vt = (_make_read_only(x) for x in (U, S, Vt))
+
+		svds = []
+		for i, matrix in enumerate(matrices):
+			svd = cls(matrix, num_modes, use_cupy=False)
+			svd._svd = (U[i], S[i], Vt[i])
+
+			svds.append(svd)
+
+		return svds
+
+	def _get_warm_start(self):
+		'''Get a starting vector for ARPACK for a similar matrix.
+
+		ARPACK iterates on the smallest of the two Gram matrices, so the starting vector
+		lies in the space of the left singular vectors for wide matrices, and in that of the
+		right singular vectors otherwise.
+
+		Returns
+		-------
+		ndarray
+			The sum of the singular vectors, of length `min(matrix.shape)`.
+		'''
+		m, n = self.matrix.shape
+
+		if m < n:
+			return self.U.sum(axis=1)
+		else:
+			return self.Vt.conj().sum(axis=0)
+
+	def _get_rank(self, S):
+		'''Get the effective rank of the matrix.
+
+		Parameters
+		----------
+		S : ndarray
+			The singular values in descending order.
+
+		Returns
+		-------
+		int
+			The number of singular values larger than `rcond` times the maximum singular value.
+		'''
+		if len(S) == 0:
+			return 0
+
+		return int(np.count_nonzero(S > self._rcond * S[0]))
+
+	def _get_working_matrix(self):
+		'''Get the matrix to decompose, in the requested data type.
+
+		Returns
+		-------
+		matrix : ndarray or any sparse matrix
+			The matrix to decompose.
+		overwrite_a : boolean
+			Whether this matrix may be overwritten. This is the case if the user allows it,
+			or if the matrix is a copy made while changing its data type.
+		'''
+		matrix = self.matrix
+
+		if self._dtype is None or matrix.dtype == self._dtype:
+			return matrix, self._overwrite_a
+
+		return matrix.astype(self._dtype), True
+
+	def _compute_svd(self):
+		'''Compute the full decomposition.
+
+		Returns
+		-------
+		tuple
+			The U, S and V^T matrices.
+		'''
+		matrix, overwrite_a = self._get_working_matrix()
+
+		if self._is_diagonal:
+			return _diagonal_svd(matrix, self.num_modes)
+		elif self._hint == 'spd':
+			return _hermitian_svd(matrix, self.num_modes, overwrite_a=overwrite_a, rng=self._seed)
+		elif self.num_modes is None:
+			return _dense_svd(matrix, overwrite_a=overwrite_a, use_cupy=self._use_cupy)
+		elif self._method == 'randomized':
+			return _randomized_svd(matrix, self.num_modes, self._num_oversampling, self._num_power_iterations, rng=self._seed)
+		else:
+			U, S, Vt = scipy.sparse.linalg.svds(matrix, self.num_modes, v0=self._warm_start)
+
+			# ARPACK returns the singular values in ascending order.
+			order = np.argsort(S)[::-1]
+
+			return np.ascontiguousarray(U[:, order]), S[order], np.ascontiguousarray(Vt[order])
+
+	def _compute_singular_values(self):
+		'''Compute only the singular values, which is cheaper than the full decomposition.
+
+		Returns
+		-------
+		ndarray
+			The singular values.
+		'''
+		if self._overwrite_a and not self._is_diagonal:
+			# The matrix can only be decomposed once, so compute everything at once.
+			return self.svd[1]
+		elif self.num_modes is not None and (self._method == 'randomized' or self._hint == 'spd'):
+			# The singular vectors are a by-product of the randomized SVD and LOBPCG.
+			return self.svd[1]
+
+		matrix, overwrite_a = self._get_working_matrix()
+
+		if self._is_diagonal:
+			return _diagonal_svd(matrix, self.num_modes, compute_uv=False)
+		elif self._hint == 'spd':
+			return _hermitian_svd(matrix, compute_uv=False, overwrite_a=overwrite_a)
+		elif self.num_modes is None:
+			return _dense_svd(matrix, compute_uv=False, overwrite_a=overwrite_a, use_cupy=self._use_cupy)
 		else:
-			self._svd = scipy.sparse.linalg.svds(matrix, int(self.num_modes))
+			S = scipy.sparse.linalg.svds(matrix, self.num_modes, v0=self._warm_start, return_singular_vectors=False)
+
+			# ARPACK returns the singular values in ascending order.
+			return np.ascontiguousarray(np.sort(S)[::-1])
 
 	@property
 	def left_singular_modes(self):
 		'''The left singular modes of the matrix, as a ModeBasis.
+
+		The mode basis is computed on first access and cached afterwards.
 		'''
+		if self._left_singular_modes is None:
+			# The columns of the transformation matrix are the modes.
+			U = self.U
+			if np.iscomplexobj(U):
+				U = U.conj()
+
+			self._left_singular_modes = ModeBasis(U)
 
-		return ModeBasis([m for m in self.U.conj().T])
+		return self._left_singular_modes
 
 	@property
 	def right_singular_modes(self):
 		'''The right singular modes of the matrix, as a ModeBasis.
+
+		The mode basis is computed on first access and cached afterwards.
 		'''
-		from ..mode_basis import ModeBasis
+		if self._right_singular_modes is None:
+			Vt = self.Vt
+			if np.iscomplexobj(Vt):
+				Vt = Vt.conj()
+
+			self._right_singular_modes = ModeBasis(Vt.T)
 
-		return ModeBasis([m for m in self.Vt.conj()])
+		return self._right_singular_modes
 
 	@property
 	def singular_values(self):
@@ -78,7 +797,18 @@ class SVD(object):
 	def S(self):  # noqa: N802
 		'''The singular values of the matrix.
 		'''
-		return self.svd[1]
+		if self._svd is not None:
+			return self._svd[1]
+
+		if self._singular_values is None:
+			S = self._compute_singular_values()
+
+			if self._rcond is not None:
+				S = S[:self._get_rank(S)]
+
+			self._singular_values = _make_read_only(S)
+
+		return self._singular_values
 
 	@property
 	def Vt(self):  # noqa: N802
@@ -91,10 +821,68 @@ class SVD(object):
 		'''
 		return self.svd[i]
 
+	def reconstruct(self):
+		'''Reconstruct the matrix from its (possibly truncated) SVD.
+
+		The singular values are broadcast into U, rather than forming a diagonal matrix.
+
+		Returns
+		-------
+		ndarray
+			The reconstructed matrix.
+		'''
+		U, S, Vt = self.svd
+
+		return (U * S).dot(Vt)
+
+	def pseudo_inverse(self, rcond=1e-15):
+		'''Compute the pseudo-inverse of the matrix from its SVD.
+
+		All modes with a singular value lower than `rcond` times the maximum singular
+		value will be ignored. The inverse singular values are broadcast into V, rather
+		than forming a diagonal matrix.
+
+		Parameters
+		----------
+		rcond : scalar
+			The relative condition number of the highest-order mode that must
+			be used for inversion.
+
+		Returns
+		-------
+		ndarray
+			The pseudo-inverse of the matrix.
+		'''
+		U, S, Vt = self.svd
+
+		# All modes may have been discarded by thresholding, so S can be empty. The
+		# result is then a zero matrix, as the inner dimension of the product is zero.
+		S_max = S[0] if len(S) else 0
+
+		S_inv = np.zeros(S.shape, dtype=np.promote_types(S.dtype, np.float32))
+		mask = S > (rcond * S_max)
+		S_inv[mask] = 1 / S[mask]
+
+		if np.iscomplexobj(U):
+			U = U.conj()
+			Vt = Vt.conj()
+
+		return (Vt.T * S_inv).dot(U.T)
+
 	@property
 	def svd(self):
 		'''The raw U, S, and V^T matrices of the SVD as a tuple.
 		'''
+		if self._svd is None:
+			U, S, Vt = self._compute_svd()
+
+			if self._rcond is not None:
+				# Discard the modes that would be thresholded out anyway.
+				rank = self._get_rank(S)
+				U, S, Vt = U[:, :rank], S[:rank], Vt[:rank]
+
+			self._svd = tuple(_make_read_only(x) for x in (U, S, Vt))
+
 		return self._svd
 
 	@property
@@ -111,6 +899,5 @@ class SVD(object):
 
 	@property
 	def M(self):  # noqa: N802
-		import warnings
 		warnings.warn('Deprecated: use "matrix" instead of "M".', DeprecationWarning, stacklevel=2)
 		return self.matrix
@@ -184,10 +184,20 @@ class SpectralNoiseFFT(SpectralNoise):
 		shift : array_like
 			The shift in the grid axes.
 		'''
-		S = [shift[i] * self.coords[i] for i in range(len(self.coords))]
-		S = np.add.reduce(np.ix_(*S))
+		# The phase ramp is separable, so apply it one axis at a time. This only
+		# requires exponentials of the separated coordinates rather than of the full grid.
+		C = self.C.shaped
+		ndim = len(self.coords)
 
-		self.C *= np.exp(-1j * S.ravel())
+		for i in range(ndim):
+			if shift[i] == 0:
+				continue
+
+			# The separated coordinates are in (x, y, ...) order, the shaped axes are reversed.
+			phase_shape = [1] * ndim
+			phase_shape[ndim - 1 - i] = -1
+
+			C *= np.exp(-1j * shift[i] * self.coords[i]).reshape(phase_shape)
 
 	def __call__(self):
 		'''Evaluate the noise on the pre-specified grid.
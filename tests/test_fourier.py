@@ -292,6 +292,187 @@ def test_fourier_filter():
 					assert np.allclose(f_out_fft, f_out_ff)
 					assert np.allclose(f_in_fft, f_in_ff)
 
+					# Single-precision fields should stay in single precision.
+					f_out_ff_single = fourier_filter.forward(f_in.astype('complex64'))
+
+					assert f_out_ff_single.dtype == np.dtype('complex64')
+					assert np.allclose(f_out_fft, f_out_ff_single, rtol=1e-4, atol=1e-4 * np.abs(f_out_fft).max())
+
+					# Restricting the number of threads should not change the result.
+					fourier_filter_single_thread = FourierFilter(input_grid, transfer_function, q, threads=1)
+
+					assert np.allclose(f_out_fft, fourier_filter_single_thread.forward(f_in))
+
+def test_fourier_filter_real():
+	for n in [16, 17, [16, 17]]:
+		for q in [1, 2, 3]:
+			input_grid = make_pupil_grid(n)
+
+			fft = FastFourierTransform(input_grid, q)
+
+			def transfer_function(grid):
+				r2 = grid.x**2 + grid.y**2
+				return Field(np.exp(-r2 / 10) + 0.3j * np.sin(grid.x) * np.exp(-r2 / 5), grid)
+
+			fourier_filter = FourierFilter(input_grid, transfer_function, q)
+
+			tf = transfer_function(fft.output_grid)
+			f_in = Field(np.random.randn(input_grid.size), input_grid)
+
+			# A Hermitian transfer function keeps a real field real.
+			f_out_ff = fourier_filter.forward(f_in)
+			f_in_ff = fourier_filter.backward(f_in)
+
+			assert np.isrealobj(f_out_ff)
+			assert np.isrealobj(f_in_ff)
+
+			assert np.allclose(fft.backward(fft.forward(f_in) * tf), f_out_ff)
+			assert np.allclose(fft.backward(fft.forward(f_in) * tf.conj()), f_in_ff)
+
+			# A non-Hermitian transfer function produces a complex field.
+			tf = Field(np.random.randn(fft.output_grid.size) + 1j * np.random.randn(fft.output_grid.size), fft.output_grid)
+			fourier_filter = FourierFilter(input_grid, tf, q)
+
+			assert np.allclose(fft.backward(fft.forward(f_in) * tf), fourier_filter.forward(f_in))
+
+def test_fourier_filter_adjoint_not_cached():
+	input_grid = make_pupil_grid(16)
+	fft = FastFourierTransform(input_grid, q=2)
+
+	tf = Field(np.random.randn(fft.output_grid.size) + 1j * np.random.randn(fft.output_grid.size), fft.output_grid)
+	fourier_filter = FourierFilter(input_grid, tf, q=2)
+
+	for dtype in [np.complex64, np.complex128, np.float64]:
+		f_in = Field(np.random.randn(input_grid.size), input_grid).astype(dtype)
+
+		rtol = 1e-4 if dtype == np.complex64 else 1e-7
+		assert np.allclose(fft.backward(fft.forward(f_in) * tf.conj()), fourier_filter.backward(f_in), rtol=rtol, atol=1e-5)
+
+	# The adjoint of a scalar transfer function is applied in-place, not cached.
+	assert not any(key[0] for key in fourier_filter._transfer_functions)
+
+def check_fourier_filter_repeated(num_repeats=3):
+	input_grid = make_pupil_grid(16)
+	fft = FastFourierTransform(input_grid, q=2)
+
+	for tensor_shape in [(), (3,), (3, 3)]:
+		tf_shape = tensor_shape + (fft.output_grid.size,)
+		transfer_function = Field(np.random.randn(*tf_shape) + 1j * np.random.randn(*tf_shape), fft.output_grid)
+
+		fourier_filter = FourierFilter(input_grid, transfer_function, q=2)
+
+		# Tensor fields are filtered by both scalar and matrix transfer functions.
+		f_shape = (3, input_grid.size)
+
+		# Repeated filtering reuses the plans and work buffers.
+		for i in range(num_repeats):
+			f_in = Field(np.random.randn(*f_shape) + 1j * np.random.randn(*f_shape), input_grid)
+
+			if len(tensor_shape) == 2:
+				f_out_fft = fft.backward(field_dot(transfer_function, fft.forward(f_in)))
+				f_in_fft = fft.backward(field_dot(field_conjugate_transpose(transfer_function), fft.forward(f_in)))
+			else:
+				f_out_fft = fft.backward(fft.forward(f_in) * transfer_function)
+				f_in_fft = fft.backward(fft.forward(f_in) * transfer_function.conj())
+
+			assert np.allclose(fourier_filter.forward(f_in), f_out_fft)
+			assert np.allclose(fourier_filter.backward(f_in), f_in_fft)
+
+		assert fourier_filter._fftw_forward is not None
+
+def test_fourier_filter_pyfftw():
+	pytest.importorskip('pyfftw')
+
+	check_fourier_filter_repeated()
+
+class NumpyFFTW(object):
+	'''A stand-in for pyfftw.FFTW using numpy.fft, with the same calling convention.
+	'''
+	def __init__(self, input_array, output_array, axes, direction, flags=(), threads=1):
+		self.input_array = input_array
+		self.output_array = output_array
+		self.axes = axes
+		self.direction = direction
+
+		self.input_shape = input_array.shape
+		self.input_dtype = input_array.dtype
+
+		# Planning with FFTW_MEASURE overwrites the arrays.
+		input_array[...] = np.nan
+		output_array[...] = np.nan
+
+	def __call__(self, input_array=None, output_array=None):
+		# Like pyFFTW, the plan is rebound to any arrays that are passed in.
+		if input_array is not None:
+			self.input_array = input_array
+		if output_array is not None:
+			self.output_array = output_array
+
+		if self.direction == 'FFTW_FORWARD':
+			self.output_array[...] = np.fft.fftn(self.input_array, axes=self.axes)
+		else:
+			self.output_array[...] = np.fft.ifftn(self.input_array, axes=self.axes)
+
+		return self.output_array
+
+def test_fourier_filter_fftw_stand_in(monkeypatch):
+	from hcipy.fourier import fourier_operations
+
+	# Run the FFTW code path with a numpy-backed stand-in for pyFFTW.
+	fake_pyfftw = type('pyfftw', (), {'FFTW': NumpyFFTW, 'empty_aligned': staticmethod(np.empty)})
+
+	monkeypatch.setattr(fourier_operations, 'pyfftw', fake_pyfftw, raising=False)
+	monkeypatch.setattr(fourier_operations, '_use_pyfftw', True)
+	monkeypatch.setattr(fourier_operations, '_scratch_buffers', {})
+
+	# Count how often the zeropadding of a work buffer is cleared.
+	num_clears = []
+	clear_outside_cutout = fourier_operations._clear_outside_cutout
+
+	def clear_outside_cutout_counted(array, cutout):
+		num_clears.append(1)
+		clear_outside_cutout(array, cutout)
+
+	monkeypatch.setattr(fourier_operations, '_clear_outside_cutout', clear_outside_cutout_counted)
+
+	check_fourier_filter_repeated(num_repeats=5)
+
+	# The padding should only be cleared after planning overwrote the buffers, not on every call.
+	assert len(num_clears) == 3
+
+def test_fourier_filter_cupy():
+	cupy = pytest.importorskip('cupy')
+
+	try:
+		cupy.cuda.runtime.getDeviceCount()
+	except Exception:
+		pytest.skip('No GPU is available for CuPy.')
+
+	input_grid = make_pupil_grid(16)
+	fft = FastFourierTransform(input_grid, q=2)
+
+	for tensor_shape in [(), (3, 3)]:
+		tf_shape = tensor_shape + (fft.output_grid.size,)
+		transfer_function = Field(np.random.randn(*tf_shape) + 1j * np.random.randn(*tf_shape), fft.output_grid)
+
+		fourier_filter_cpu = FourierFilter(input_grid, transfer_function, q=2, use_cupy=False)
+		fourier_filter_gpu = FourierFilter(input_grid, transfer_function, q=2, use_cupy=True)
+
+		assert fourier_filter_gpu.use_cupy
+
+		# The GPU filter should give the same results as the CPU filter, and return numpy arrays.
+		for f_shape in [(input_grid.size,), (3, input_grid.size)]:
+			if len(tensor_shape) == 2 and len(f_shape) == 1:
+				continue
+
+			f_in = Field(np.random.randn(*f_shape) + 1j * np.random.randn(*f_shape), input_grid)
+
+			for op in ['forward', 'backward']:
+				f_out_gpu = getattr(fourier_filter_gpu, op)(f_in)
+
+				assert isinstance(f_out_gpu, np.ndarray)
+				assert np.allclose(f_out_gpu, getattr(fourier_filter_cpu, op)(f_in))
+
 def check_czt_vs_scipy(x, m, w, a, dtype):
 	# Check that the CZT gives the same answer as the scipy implementation.
 	n = len(x)
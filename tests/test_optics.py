@@ -200,11 +200,106 @@ def test_deformable_mirror():
 			# Check OPD
 			assert np.allclose(deformable_mirror.opd, 2 * deformable_mirror.surface)
 
+			# Check that a cached phasor is not reused after changing the actuators
+			deformable_mirror.random(0.001)
+			wf_out = deformable_mirror.forward(wf)
+
+			assert np.allclose(wf_out.phase, deformable_mirror.phase_for(1))
+
 			deformable_mirror.flatten()
 
 			# Check that the deformable mirror is flat again
 			assert np.std(deformable_mirror.surface) < 1e-12
 
+def test_find_illuminated_actuators():
+	grid = make_pupil_grid(64)
+	aperture = make_circular_aperture(0.9)(grid)
+
+	influence_functions = make_gaussian_influence_functions(grid, 12, 1 / 10)
+
+	# Compute the reference using the dense transformation matrix.
+	T = influence_functions.to_dense().transformation_matrix
+	total_power = np.sum(np.abs(T)**2, axis=0)
+	masked_power = np.sum(np.abs(T[aperture > 0])**2, axis=0)
+	illuminated = masked_power >= 0.1 * total_power
+
+	for basis in [influence_functions, influence_functions.to_dense()]:
+		illuminated_influence_functions = find_illuminated_actuators(basis, aperture, 0.1)
+
+		assert len(illuminated_influence_functions) == np.count_nonzero(illuminated)
+		assert np.allclose(illuminated_influence_functions.to_dense().transformation_matrix, T[:, illuminated])
+
+def test_deformable_mirror_phasor_cache():
+	grid = make_pupil_grid(64)
+	influence_functions = make_gaussian_influence_functions(grid, 8, 1 / 6)
+
+	deformable_mirror = DeformableMirror(influence_functions)
+	deformable_mirror.actuators = np.random.randn(deformable_mirror.num_actuators) * 1e-7
+
+	wavelengths = [500e-9, 600e-9, 700e-9]
+	wavefronts = [Wavefront(grid.ones(), wavelength) for wavelength in wavelengths]
+
+	def check_propagation():
+		for wf in wavefronts:
+			phase = 2 * wf.wavenumber * deformable_mirror.surface
+
+			assert np.allclose(deformable_mirror.forward(wf).electric_field, np.exp(1j * phase))
+			assert np.allclose(deformable_mirror.backward(wf).electric_field, np.exp(-1j * phase))
+
+	# The default cache holds one forward and one backward phasor.
+	check_propagation()
+	assert len(deformable_mirror._phasor_cache) == 2
+
+	# A larger cache holds all phasors.
+	deformable_mirror.max_phasors_in_cache = 6
+	check_propagation()
+	assert len(deformable_mirror._phasor_cache) == 6
+
+	# Reducing the size of the cache removes the oldest phasors.
+	deformable_mirror.max_phasors_in_cache = 1
+	assert len(deformable_mirror._phasor_cache) == 1
+
+	# The cache can be disabled.
+	deformable_mirror.max_phasors_in_cache = 0
+	assert len(deformable_mirror._phasor_cache) == 0
+
+	check_propagation()
+	assert len(deformable_mirror._phasor_cache) == 0
+
+def test_deformable_mirror_numba(monkeypatch):
+	pytest.importorskip('numba')
+
+	from hcipy.optics import deformable_mirror
+
+	assert deformable_mirror._use_numba
+
+	# The compiled kernel should agree with the direct evaluation, also for large phases.
+	surface = np.random.randn(1000) * 1e-5
+	for phase_factor in [2 * np.pi / 500e-9, -2 * np.pi / 500e-9]:
+		phasor = deformable_mirror._numba_phasor(surface, phase_factor)
+		assert np.allclose(phasor, np.exp(1j * phase_factor * surface))
+
+	# The deformable mirror should use the kernel for both propagation directions.
+	num_calls = []
+	numba_phasor = deformable_mirror._numba_phasor
+
+	def numba_phasor_counted(surface, phase_factor):
+		num_calls.append(1)
+		return numba_phasor(surface, phase_factor)
+
+	monkeypatch.setattr(deformable_mirror, '_numba_phasor', numba_phasor_counted)
+
+	grid = make_pupil_grid(64)
+	dm = DeformableMirror(make_gaussian_influence_functions(grid, 8, 1 / 6))
+	dm.actuators = np.random.randn(dm.num_actuators) * 1e-7
+
+	wf = Wavefront(grid.ones(), 500e-9)
+	phase = 2 * wf.wavenumber * dm.surface
+
+	assert np.allclose(dm.forward(wf).electric_field, np.exp(1j * phase))
+	assert np.allclose(dm.backward(wf).electric_field, np.exp(-1j * phase))
+	assert len(num_calls) == 2
+
 def test_segmented_deformable_mirror():
 	num_pix = 256
 	grid = make_pupil_grid(num_pix)
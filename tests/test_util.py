@@ -1,5 +1,8 @@
 import numpy as np
 import os
+import pytest
+import scipy.sparse
+import scipy.sparse.linalg
 from hcipy import *
 
 def test_grid_io():
@@ -139,3 +142,280 @@ def test_emccd_noise():
 	noise = make_emccd_noise(photo_electron_flux * np.ones((num_trials, num_runs)), read_noise, emgain)
 
 	assert abs(np.std(np.mean(noise, axis=0) / emgain - photo_electron_flux) - sigma) / sigma < 1e-2
+
+def test_spectral_noise_shift():
+	grid = make_uniform_grid([64, 32], [64, 32])
+	psd = lambda input_grid: Field(np.exp(-10 * (input_grid.x**2 + input_grid.y**2)), input_grid)
+
+	noise = SpectralNoiseFactoryFFT(psd, grid).make_random(seed=1)
+	screen = noise().shaped
+
+	# Shifts by integer pixels should correspond to rolling the noise along each axis.
+	for shift in [(3, 0), (0, 5), (-2, 4)]:
+		screen_shifted = noise.shifted(shift)().shaped
+		screen_rolled = np.roll(screen, shift[::-1], axis=(0, 1))
+
+		assert np.allclose(screen_shifted, screen_rolled)
+
+def _make_svd_test_matrix(rng):
+	# A matrix with quickly decaying singular values.
+	U, _ = np.linalg.qr(rng.standard_normal((300, 100)))
+	V, _ = np.linalg.qr(rng.standard_normal((200, 100)))
+	S = np.exp(-np.arange(100) / 2)
+
+	return (U * S).dot(V.T), S
+
+def test_svd():
+	matrix, S = _make_svd_test_matrix(np.random.default_rng(0))
+
+	svd = SVD(matrix)
+	assert np.allclose(svd.S[:100], S)
+
+	# The singular modes should be the columns of U and V.
+	assert np.allclose(svd.left_singular_modes.transformation_matrix, svd.U)
+	assert np.allclose(svd.right_singular_modes.transformation_matrix, svd.Vt.T)
+	assert len(svd.left_singular_modes) == 200
+
+	# The conjugate should be taken for complex matrices.
+	svd_complex = SVD(matrix + 1j * matrix[::-1])
+	assert np.allclose(svd_complex.left_singular_modes.transformation_matrix, svd_complex.U.conj())
+	assert np.allclose(svd_complex.right_singular_modes.transformation_matrix, svd_complex.Vt.conj().T)
+
+	# Reconstruct the matrix and its pseudo-inverse.
+	assert np.allclose(svd.reconstruct(), matrix)
+	assert np.allclose(svd.pseudo_inverse(1e-4), np.linalg.pinv(matrix, 1e-4))
+	assert np.allclose(svd_complex.pseudo_inverse(1e-4), np.linalg.pinv(svd_complex.matrix, 1e-4))
+
+	with pytest.raises(ValueError):
+		SVD(matrix, 8, method='unknown')
+
+	# Array-likes should be accepted as well.
+	assert np.allclose(SVD([[1., 2], [3, 4]]).S, np.linalg.svd([[1., 2], [3, 4]], compute_uv=False))
+	assert np.allclose(SVD([[2, 0], [0, -3]]).S, [3, 2])
+	assert np.allclose(SVD.from_previous(matrix.tolist(), SVD(matrix, 8)).S, S[:8])
+
+	# Non-finite matrices cannot be decomposed.
+	for value in [np.nan, np.inf]:
+		matrix_nonfinite = matrix.copy()
+		matrix_nonfinite[10, 20] = value
+
+		for overwrite_a in [False, True]:
+			with pytest.raises(np.linalg.LinAlgError):
+				SVD(matrix_nonfinite.copy(), overwrite_a=overwrite_a).S
+
+	# Computing all but one mode of a sparse matrix is slow, so it should warn.
+	with pytest.warns(UserWarning):
+		SVD(scipy.sparse.csr_matrix(matrix[:20, :10]))
+
+def test_svd_lazy():
+	matrix, S = _make_svd_test_matrix(np.random.default_rng(0))
+
+	# Only computing the singular values should give the same result.
+	for num_modes in [None, 8]:
+		svd = SVD(matrix, num_modes)
+
+		assert np.allclose(svd.singular_values[:8], S[:8])
+		assert svd._svd is None
+
+	# The cached results should be C-contiguous and read-only.
+	for x in SVD(matrix).svd:
+		assert x.flags.c_contiguous
+		assert not x.flags.writeable
+
+def test_svd_truncated():
+	matrix, S = _make_svd_test_matrix(np.random.default_rng(0))
+	svd_full = SVD(matrix)
+
+	for method in ['arpack', 'randomized']:
+		svd = SVD(matrix, 8, method=method)
+
+		# The singular values should be in descending order for all methods.
+		assert np.allclose(svd.S, S[:8])
+
+		# Compare the reconstructions, as these are independent of the signs of the modes.
+		reconstruction_full = (svd_full.U[:, :8] * svd_full.S[:8]).dot(svd_full.Vt[:8])
+		assert np.allclose(svd.reconstruct(), reconstruction_full)
+
+	# The number of modes is converted to an integer once.
+	svd = SVD(matrix, 8.0)
+	assert svd.num_modes == 8 and isinstance(svd.num_modes, int)
+	assert len(svd.S) == 8
+
+def test_svd_randomized():
+	rng = np.random.default_rng(0)
+
+	# A Gaussian matrix has slowly decaying singular values.
+	matrix = rng.standard_normal((400, 200))
+	U, S, Vt = np.linalg.svd(matrix, full_matrices=False)
+
+	# The default method should stay accurate for such matrices.
+	assert np.allclose(SVD(matrix, 10).S, S[:10])
+	assert np.allclose(inverse_truncated_modal(matrix, 10), (Vt[:10].T / S[:10]).dot(U[:, :10].T))
+
+	# The randomized SVD is only approximate for such matrices, but reproducible with a seed.
+	svd = SVD(matrix, 10, method='randomized', seed=1)
+	assert np.allclose(svd.S, S[:10], rtol=0.1)
+	assert np.array_equal(svd.S, SVD(matrix, 10, method='randomized', seed=1).S)
+
+	# More power iterations should make the randomized SVD more accurate.
+	matrix, S = _make_svd_test_matrix(rng)
+
+	errors = []
+	for num_power_iterations in [0, 4]:
+		svd = SVD(matrix, 8, method='randomized', num_oversampling=2, num_power_iterations=num_power_iterations, seed=1)
+		errors.append(np.abs(svd.S - S[:8]).max())
+	assert errors[1] < errors[0]
+	assert errors[1] < 1e-10
+
+	# The randomized SVD should also work for sparse matrices.
+	svd = SVD(scipy.sparse.csr_matrix(matrix), 8, method='randomized')
+	assert np.allclose(svd.S, S[:8])
+
+def test_svd_overwrite():
+	matrix, S = _make_svd_test_matrix(np.random.default_rng(0))
+
+	# Overwriting the matrix should not change the result, for both memory orders.
+	for m in [np.asfortranarray(matrix), matrix.copy()]:
+		svd = SVD(m, overwrite_a=True)
+
+		assert np.allclose(svd.S[:100], S)
+		assert np.allclose(svd.reconstruct(), matrix)
+
+def test_svd_dtype():
+	matrix, S = _make_svd_test_matrix(np.random.default_rng(0))
+
+	# Single-precision SVDs should stay in single precision.
+	for num_modes in [None, 8]:
+		svd = SVD(matrix, num_modes, dtype='float32')
+
+		assert svd.U.dtype == np.float32
+		assert svd.S.dtype == np.float32
+		assert np.allclose(svd.S[:8], S[:8], atol=1e-5)
+
+def test_svd_cupy():
+	cupy = pytest.importorskip('cupy')
+
+	try:
+		cupy.cuda.runtime.getDeviceCount()
+	except Exception:
+		pytest.skip('No GPU is available for CuPy.')
+
+	matrix, S = _make_svd_test_matrix(np.random.default_rng(0))
+
+	svd = SVD(matrix, use_cupy=True)
+	assert svd._use_cupy
+
+	# The results should be copied back into numpy arrays.
+	for x in svd.svd:
+		assert isinstance(x, np.ndarray)
+
+	assert np.allclose(svd.S[:100], S)
+	assert np.allclose(svd.reconstruct(), matrix)
+	assert np.allclose(SVD(matrix, use_cupy=True).S[:100], S)
+
+def test_svd_warm_start(monkeypatch):
+	matrix, S = _make_svd_test_matrix(np.random.default_rng(0))
+
+	# Record the starting vectors that are passed to ARPACK.
+	starting_vectors = []
+	svds = scipy.sparse.linalg.svds
+
+	def svds_recorded(*args, **kwargs):
+		starting_vectors.append(kwargs.get('v0'))
+		return svds(*args, **kwargs)
+
+	monkeypatch.setattr(scipy.sparse.linalg, 'svds', svds_recorded)
+
+	# Warm-starting from a previous SVD should give the same result.
+	for m in [matrix, matrix.T]:
+		svd_previous = SVD(m, 8, method='randomized', seed=1)
+		svd = SVD.from_previous(m * (1 + 1e-6), svd_previous)
+
+		assert svd.num_modes == 8
+		assert np.allclose(svd.S, svd_previous.S * (1 + 1e-6))
+
+		# ARPACK should have been started from the previous singular vectors.
+		assert svd._method == 'arpack'
+		assert len(starting_vectors[-1]) == min(m.shape)
+
+	# A supplied starting vector should not compute the previous SVD.
+	svd_previous = SVD(matrix, 8)
+	SVD.from_previous(matrix, svd_previous, warm_start=np.ones(200))
+	assert svd_previous._svd is None
+
+	with pytest.raises(ValueError):
+		SVD.from_previous(matrix.T, svd_previous)
+
+def test_svd_spd():
+	matrix, S = _make_svd_test_matrix(np.random.default_rng(0))
+
+	# Positive semi-definite matrices can use an eigendecomposition instead.
+	gram = matrix.T.dot(matrix)
+	for num_modes in [None, 8]:
+		svd = SVD(gram, num_modes, hint='spd', seed=1)
+		svd_reference = SVD(gram, num_modes)
+
+		assert np.allclose(svd.S[:8], S[:8]**2)
+		assert np.allclose(SVD(gram, num_modes, hint='spd', seed=1).S, svd_reference.S)
+		assert np.allclose(svd.reconstruct(), svd_reference.reconstruct())
+
+	with pytest.raises(ValueError):
+		SVD(gram, hint='unknown')
+
+def test_svd_batch():
+	rng = np.random.default_rng(0)
+
+	# A stack of matrices can be decomposed at once.
+	matrices = rng.standard_normal((5, 6, 4))
+	for num_modes in [None, 2]:
+		svds = SVD.batch(matrices, num_modes)
+
+		assert len(svds) == 5
+		for svd, m in zip(svds, matrices):
+			U, S, Vt = np.linalg.svd(m, full_matrices=False)
+
+			assert np.allclose(svd.S, S[:num_modes])
+			assert np.allclose(svd.reconstruct(), (U[:, :num_modes] * S[:num_modes]).dot(Vt[:num_modes]))
+			assert not svd.U.flags.writeable
+
+	with pytest.raises(ValueError):
+		SVD.batch(matrices[0])
+
+def test_svd_rcond():
+	matrix, S = _make_svd_test_matrix(np.random.default_rng(0))
+
+	# Thresholding should discard the modes with small singular values.
+	svd = SVD(matrix, rcond=1e-4)
+	rank = np.count_nonzero(S > 1e-4)
+
+	assert len(svd.S) == rank
+	assert svd.U.shape == (300, rank) and svd.Vt.shape == (rank, 200)
+	assert np.allclose(svd.pseudo_inverse(), SVD(matrix).pseudo_inverse(1e-4))
+	assert len(SVD(matrix, rcond=1e-4).S) == rank
+
+	# A zero matrix has no modes left after thresholding. The large matrix is not
+	# detected as diagonal, so that it is decomposed with LAPACK.
+	for m, n in [(4, 3), (600, 3)]:
+		svd = SVD(np.zeros((m, n)), rcond=1e-15)
+		assert len(svd.S) == 0
+		assert np.array_equal(svd.pseudo_inverse(), np.zeros((n, m)))
+		assert np.array_equal(inverse_truncated(np.zeros((m, n))), np.zeros((n, m)))
+
+def test_svd_diagonal():
+	# Diagonal matrices should be decomposed without calling LAPACK.
+	d = np.array([1, -3, 0, 2j])
+	for diagonal in [np.diag(d), scipy.sparse.diags(d)]:
+		svd = SVD(diagonal)
+
+		assert svd._is_diagonal
+		assert np.allclose(svd.S, [3, 2, 1, 0])
+		assert np.allclose(svd.reconstruct(), np.diag(d))
+		assert np.allclose(svd.U.conj().T.dot(svd.U), np.eye(4))
+		assert np.allclose(SVD(diagonal).S, svd.S)
+		assert np.allclose(SVD(diagonal, 2).S, [3, 2])
+
+	# Integer matrices should have floating-point singular values.
+	svd = SVD(np.diag([3, -2, 1]))
+	assert svd.S.dtype == np.float64
+	assert np.allclose(svd.S, [3, 2, 1])
+	assert np.allclose(inverse_truncated(np.diag([4, 2, 1])), np.diag([0.25, 0.5, 1]))